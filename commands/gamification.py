@@ -1,7 +1,35 @@
 import discord
 from discord.ext import commands
 from core.gamification import gamification, get_level_title, format_exp_bar
-from datetime import datetime
+from core.ratelimit import RateLimiter
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+LEADERBOARD_CATEGORIES = {
+    "level": ("level", "🏆 Level Leaderboard", "Level"),
+    "exp": ("total_exp", "✨ EXP Leaderboard", "Total EXP"),
+    "coins": ("coins", "🪙 Coins Leaderboard", "Coins"),
+    "chats": ("miaw_interactions", "💬 Chat Leaderboard", "Chats"),
+    "achievements": ("achievements", "🏆 Achievement Leaderboard", "Achievements")
+}
+
+def leaderboard_scope(ctx):
+    """Guild id and (lazy) member ids for a per-server leaderboard, or (None, None) for the global one
+
+    Without the members intent, or before the guild is chunked, the member cache
+    is incomplete, so the global leaderboard is used instead.
+    """
+    guild = ctx.guild
+    if guild is None or not ctx.bot.intents.members or not guild.chunked:
+        return None, None
+    return str(guild.id), (str(member.id) for member in guild.members if not member.bot)
+
+# Remembers who already claimed today, so repeat !daily calls skip the profile lookup
+daily_cooldown = RateLimiter('daily', rate=1, per=86400)
+
+def seconds_until_midnight(now: datetime) -> float:
+    """Seconds until the next daily reset (local midnight)"""
+    return (datetime.combine(now.date() + timedelta(days=1), time.min) - now).total_seconds()
 
 def setup_gamification_commands(bot):
     
@@ -97,61 +125,74 @@ def setup_gamification_commands(bot):
         await ctx.reply(embed=embed)
     
     @bot.command(name='leaderboard')
-    async def leaderboard(ctx, category: str = "level"):
-        """Show leaderboards - categories: level, exp, coins, chats"""
-        valid_categories = {
-            "level": ("level", "🏆 Level Leaderboard", "Level"),
-            "exp": ("total_exp", "✨ EXP Leaderboard", "Total EXP"),
-            "coins": ("coins", "🪙 Coins Leaderboard", "Coins"),
-            "chats": ("miaw_interactions", "💬 Chat Leaderboard", "Chats"),
-            "achievements": ("achievements", "🏆 Achievement Leaderboard", "Achievements")
-        }
-        
-        if category not in valid_categories:
-            await ctx.reply(f"❌ Invalid category! Use: {', '.join(valid_categories.keys())}")
+    async def leaderboard(ctx, category: str = "level", page: int = 1):
+        """Show leaderboards - categories: level, exp, coins, chats, achievements"""
+        if category not in LEADERBOARD_CATEGORIES:
+            await ctx.reply(f"❌ Invalid category! Use: {', '.join(LEADERBOARD_CATEGORIES.keys())}")
             return
         
-        sort_key, title, display_name = valid_categories[category]
-        
-        # Sort users
-        if sort_key == "achievements":
-            sorted_users = sorted(
-                gamification.user_data.items(),
-                key=lambda x: len(x[1][sort_key]),
-                reverse=True
-            )[:10]
-        else:
-            sorted_users = sorted(
-                gamification.user_data.items(),
-                key=lambda x: x[1][sort_key],
-                reverse=True
-            )[:10]
+        sort_key, title, display_name = LEADERBOARD_CATEGORIES[category]
+        guild_id, member_ids = leaderboard_scope(ctx)
+        result = gamification.leaderboard_page(sort_key, max(page, 1), 10, guild_id, member_ids)
+        if result.get("warming"):
+            await ctx.reply("⏳ Leaderboard lagi disiapin nih~ Coba lagi sebentar ya!")
+            return
         
         embed = discord.Embed(
-            title=title,
+            title=title if guild_id is None else f"{title} - {ctx.guild.name}",
             color=0xe74c3c
         )
         
         leaderboard_text = ""
-        medals = ["🥇", "🥈", "🥉"] + ["🏅"] * 7
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
         
-        for i, (user_id, data) in enumerate(sorted_users):
+        for entry in result["entries"]:
+            user_id, data = entry["user_id"], entry["profile"]
             try:
                 user = bot.get_user(int(user_id))
                 username = user.display_name if user else f"User {user_id[:6]}"
             except:
                 username = f"User {user_id[:6]}"
             
-            if sort_key == "achievements":
-                value = len(data[sort_key])
-            else:
-                value = data[sort_key]
-            
+            medal = medals.get(entry["rank"], "🏅" if entry["rank"] <= 10 else f"#{entry['rank']}")
             level_title = get_level_title(data["level"])
-            leaderboard_text += f"{medals[i]} **{username}** - Level {data['level']}\n{level_title}\n{display_name}: {value:,}\n\n"
+            leaderboard_text += f"{medal} **{username}** - Level {data['level']}\n{level_title}\n{display_name}: {entry['score']:,}\n\n"
+        
+        embed.description = leaderboard_text or "Belum ada yang masuk leaderboard di halaman ini~"
+        embed.set_footer(text=f"Page {result['page']}/{result['pages']} • Keep chatting to climb the leaderboard! 🚀")
+        
+        await ctx.reply(embed=embed)
+    
+    @bot.command(name='rank')
+    async def show_rank(ctx, mentioned: Optional[discord.Member] = None, category: str = "level",
+                        member: Optional[discord.Member] = None):
+        """Show your rank in a leaderboard category (!rank, !rank coins @user or !rank @user coins)"""
+        if category not in LEADERBOARD_CATEGORIES:
+            await ctx.reply(f"❌ Invalid category! Use: {', '.join(LEADERBOARD_CATEGORIES.keys())}")
+            return
         
-        embed.description = leaderboard_text
-        embed.set_footer(text="Keep chatting to climb the leaderboard! 🚀")
+        target = mentioned or member or ctx.author
+        sort_key, title, display_name = LEADERBOARD_CATEGORIES[category]
+        guild_id, member_ids = leaderboard_scope(ctx)
+        
+        result = gamification.leaderboard_rank(str(target.id), sort_key, guild_id, member_ids)
+        if result is None:
+            await ctx.reply(f"😿 {target.display_name} belum punya profile. Ngobrol dulu sama Miawka ya~")
+            return
+        if result.get("warming"):
+            await ctx.reply("⏳ Leaderboard lagi disiapin nih~ Coba lagi sebentar ya!")
+            return
+        
+        embed = discord.Embed(
+            title=f"📊 {target.display_name}'s Rank",
+            description=f"**#{result['rank']:,}** of {result['total']:,} in {title}",
+            color=0xe74c3c
+        )
+        embed.add_field(name=display_name, value=f"{result['score']:,}", inline=True)
+        if guild_id is not None:
+            global_result = gamification.leaderboard_rank(str(target.id), sort_key)
+            if global_result and not global_result.get("warming"):
+                embed.add_field(name="🌍 Global", value=f"#{global_result['rank']:,} of {global_result['total']:,}", inline=True)
         
         await ctx.reply(embed=embed)
     
@@ -159,10 +200,16 @@ def setup_gamification_commands(bot):
     async def daily_reward(ctx):
         """Claim daily rewards"""
         user_id = str(ctx.author.id)
+        if daily_cooldown.retry_after(user_id):
+            await ctx.reply("😤 Kamu udah claim daily reward hari ini! Balik lagi besok ya~")
+            return
         profile = gamification.get_user_profile(user_id)
         
-        today = datetime.now().date().isoformat()
+        # The stored claim date stays authoritative (it survives restarts)
+        now = datetime.now()
+        today = now.date().isoformat()
         if profile.get("last_daily_claim") == today:
+            daily_cooldown.block(user_id, seconds_until_midnight(now))
             await ctx.reply("😤 Kamu udah claim daily reward hari ini! Balik lagi besok ya~")
             return
         
@@ -175,7 +222,8 @@ def setup_gamification_commands(bot):
         # Add rewards
         exp_result = gamification.add_exp(user_id, total_exp, "daily_reward")
         profile["last_daily_claim"] = today
-        gamification.save_user_data()
+        gamification.record_event("daily_claimed", user_id, "last_daily_claim")
+        daily_cooldown.block(user_id, seconds_until_midnight(now))
         
         embed = discord.Embed(
             title="🎁 Daily Reward Claimed!",
@@ -197,6 +245,14 @@ def setup_gamification_commands(bot):
                 inline=False
             )
         
+        for unlocked in exp_result.get("achievements", []):
+            achievement = unlocked["achievement"]
+            embed.add_field(
+                name="🏆 Achievement Unlocked!",
+                value=f"{achievement['icon']} **{achievement['name']}**\n{achievement['description']} (+{unlocked['exp_reward']} EXP)",
+                inline=False
+            )
+        
         embed.set_footer(text="Come back tomorrow for more rewards! Streak bonus increases daily! 🌟")
         
         await ctx.reply(embed=embed)
\ No newline at end of file
@@ -1,10 +1,16 @@
-import openai
 import re
 import asyncio
 import random
 import discord
 from discord.ext import commands
-from core.globals import conversation_histories, SYSTEM_PROMPT_MIAW, create_mood_prompt, update_mood, get_llm_config, cleanup_old_conversations
+from core.globals import conversation_histories, SYSTEM_PROMPT_MIAW, create_mood_prompt, update_mood, get_llm_config
+from core.history import pack_history, summary_messages
+from core.keywords import analyze_message
+from core.summarizer import history_compactor
+from core.llm import llm_gateway
+from core.admission import AdmissionRejected
+from core.circuit import CircuitOpenError
+from core.ratelimit import rate_limit
 
 # Try to import gamification, but don't crash if it fails
 try:
@@ -37,57 +43,44 @@ MIAW_REACTIONS = {
     'sleepy': ['😴', '💤', '🥱', '😪', '🌙', '💭']
 }
 
-def get_interactive_reaction(message_content, mood):
+# Sentiment category -> reaction set, checked in order
+SENTIMENT_REACTIONS = [
+    ('sad', 'positive'),
+    ('happy', 'excited'),
+    ('confused', 'confused'),
+    ('tired', 'sleepy')
+]
+
+# Keyword categories reported as interaction flags
+INTERACTION_TYPES = ['greeting', 'farewell', 'compliment', 'question', 'love', 'pat', 'food', 'game', 'sing', 'tsundere']
+
+def get_interactive_reaction(features, mood):
     """Get appropriate reaction based on message content and mood"""
-    message_lower = message_content.lower()
-    
     # Detect message sentiment
-    if any(word in message_lower for word in ['sad', 'sedih', 'down', 'bete', 'galau']):
-        return random.choice(MIAW_REACTIONS['positive'])
-    elif any(word in message_lower for word in ['happy', 'senang', 'excited', 'hype']):
-        return random.choice(MIAW_REACTIONS['excited'])
-    elif any(word in message_lower for word in ['confused', 'bingung', 'ga ngerti']):
-        return random.choice(MIAW_REACTIONS['confused'])
-    elif any(word in message_lower for word in ['tired', 'capek', 'sleepy', 'ngantuk']):
-        return random.choice(MIAW_REACTIONS['sleepy'])
-    elif mood == 'tsundere':
+    for category, reaction_set in SENTIMENT_REACTIONS:
+        if category in features.categories:
+            return random.choice(MIAW_REACTIONS[reaction_set])
+    if mood == 'tsundere':
         return random.choice(MIAW_REACTIONS['tsundere'])
-    else:
-        return random.choice(MIAW_REACTIONS['positive'])
+    return random.choice(MIAW_REACTIONS['positive'])
 
-def detect_special_interactions(message_content):
+def detect_special_interactions(features):
     """Detect special interaction patterns"""
-    message_lower = message_content.lower()
-    
-    interactions = {
-        'greeting': any(word in message_lower for word in ['hi', 'hai', 'hello', 'halo', 'hey']),
-        'farewell': any(word in message_lower for word in ['bye', 'goodbye', 'dadah', 'see you', 'sampai jumpa']),
-        'compliment': any(word in message_lower for word in ['cute', 'lucu', 'cantik', 'imut', 'kawaii']),
-        'question': '?' in message_content,
-        'love': any(word in message_lower for word in ['love', 'sayang', 'cinta', 'suka']),
-        'pat': any(word in message_lower for word in ['pat', 'elus', 'usap', '*pat*']),
-        'food': any(word in message_lower for word in ['makan', 'food', 'lapar', 'hungry']),
-        'game': any(word in message_lower for word in ['game', 'main', 'play', 'gaming']),
-        'sing': any(word in message_lower for word in ['sing', 'nyanyi', 'lagu', 'song'])
-    }
-    
-    return interactions
+    return {interaction: interaction in features.categories for interaction in INTERACTION_TYPES}
 
-async def add_interactive_elements(ctx, message_content, mood):
+async def add_interactive_elements(ctx, features, mood):
     """Add interactive elements like reactions, typing delays, etc."""
-    interactions = detect_special_interactions(message_content)
-    
     # Add reaction emoji
-    reaction = get_interactive_reaction(message_content, mood)
+    reaction = get_interactive_reaction(features, mood)
     try:
         await ctx.message.add_reaction(reaction)
     except:
         pass  # Ignore if reaction fails
     
     # Special typing delays for different interactions
-    if interactions['question']:
+    if 'question' in features.categories:
         await asyncio.sleep(random.uniform(1.5, 3.0))  # Think longer for questions
-    elif interactions['compliment']:
+    elif 'compliment' in features.categories:
         await asyncio.sleep(random.uniform(0.5, 1.5))  # Quick shy response
     else:
         await asyncio.sleep(random.uniform(0.5, 2.0))  # Normal delay
@@ -126,24 +119,23 @@ def handle_gamification_rewards(ctx, user_id, interactions, exp_reward):
         return None, []
     
     try:
-        # Track interaction and get achievements
-        new_achievements = gamification.track_interaction(user_id, "miaw")
+        # One batched update: interactions, EXP and a single achievement check
+        events = [{"interaction": "miaw"}]
         if interactions.get('tsundere'):
-            gamification.track_interaction(user_id, "tsundere")
+            events.append({"interaction": "tsundere"})
         if interactions.get('pat'):
-            gamification.track_interaction(user_id, "pat")
-        
-        # Add EXP
-        exp_result = gamification.add_exp(user_id, exp_reward, "miaw_chat")
+            events.append({"interaction": "pat"})
+        events.append({"exp": exp_reward, "source": "miaw_chat"})
         
-        return exp_result, new_achievements
+        result = gamification.apply_events(user_id, events)
+        return result["exp"], result["achievements"]
     except Exception as e:
         print(f"Gamification error: {e}")
         return None, []
 
 def setup_miaw_command(bot):
     @bot.command(name='miaw')
-    @commands.cooldown(rate=3, per=60, type=commands.BucketType.user)
+    @rate_limit(rate=3, per=60)
     async def chat_with_cat(ctx, *, message=None):
         user_id = str(ctx.author.id)  # Convert to string for JSON
         user_name = ctx.author.display_name
@@ -190,15 +182,14 @@ def setup_miaw_command(bot):
             await ctx.reply(embed=embed)
             return
         
-        if user_id not in conversation_histories['miaw']:
-            conversation_histories['miaw'][user_id] = []
-
         # Add the user's message to the conversation history
-        conversation_histories['miaw'][user_id].append({"role": "user", "content": message})
+        history = conversation_histories['miaw'].get_or_create(user_id)
+        history.append({"role": "user", "content": message})
 
         # Get current mood and interactions
         mood = update_mood(user_id, 'miaw')
-        interactions = detect_special_interactions(message)
+        features = analyze_message(message)  # One pass finds every keyword category
+        interactions = detect_special_interactions(features)
         
         # Calculate EXP based on interaction type
         exp_reward = 10  # Base EXP
@@ -217,31 +208,25 @@ def setup_miaw_command(bot):
             {"role": "system", "content": enhanced_prompt},
             {"role": "system", "content": create_mood_prompt(mood)},
             {"role": "system", "content": f"User name: {user_name}. Use their name naturally in conversation sometimes. RESPOND WITH NATURAL TEXT - NO MARKDOWN, NO EMBEDS, just natural conversational text."},
+            # Compacted memory of older turns, then recent turns that fit the model's
+            # history budget (current message excluded)
+            *summary_messages(history),
+            *pack_history(
+                history,
+                get_llm_config()['settings']['miaw']['history_tokens'],
+                skip_latest=1
+            ),
             {"role": "user", "content": message}
         ]
 
         try:
-            config = get_llm_config()
-            
             async with ctx.typing():
-                await add_interactive_elements(ctx, message, mood)
+                await add_interactive_elements(ctx, features, mood)
                 
-                client = openai.OpenAI(
-                    api_key=config['api_key'],
-                    base_url=config['base_url'] if config['base_url'] else "https://api.openai.com/v1",
-                    timeout=30.0
-                )
-
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: client.chat.completions.create(
-                        model=config['models']['miaw'],
-                        messages=conversation,
-                        max_tokens=2048,
-                        temperature=0.9
-                    )
+                answer = await llm_gateway.chat(
+                    'miaw',
+                    conversation
                 )
-                answer = response.choices[0].message.content
                 answer = clean_response(answer)
                 
             # Send the main response
@@ -287,10 +272,10 @@ def setup_miaw_command(bot):
             except:
                 pass
 
-            conversation_histories['miaw'][user_id].append({"role": "assistant", "content": answer})
+            history.append({"role": "assistant", "content": answer})
             
-            if random.random() < 0.1:
-                cleanup_old_conversations()
+            # Fold older turns into a summary in the background (never delays this reply)
+            history_compactor.maybe_schedule('miaw', user_id)
                 
         except asyncio.TimeoutError:
             # Natural error response
@@ -300,6 +285,12 @@ def setup_miaw_command(bot):
             except:
                 pass
             await ctx.reply("⏱️ Aduh, Miawka kelamaan mikir nih~ Coba lagi ya! 😸")
+        except CircuitOpenError:
+            # Upstream is known to be down, answer right away instead of waiting on a timeout
+            await ctx.reply("😿 Otak Miawka lagi gangguan sebentar nih~ Coba lagi nanti ya!")
+        except AdmissionRejected as e:
+            # Provider is saturated, tell the user instead of queueing forever
+            await ctx.reply(f"😵 Miawka lagi rame banget yang ngajak ngobrol~ Coba lagi {max(1, round(e.retry_after))} detik lagi ya!")
         except Exception as e:
             print(f"Miaw command error: {type(e).__name__}: {str(e)}")
             await ctx.reply(f"😿 Miawka error nih~ `{type(e).__name__}`. Coba lagi ya!")
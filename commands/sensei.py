@@ -1,11 +1,20 @@
-import openai
 import re
 import asyncio
-import random
-from discord.ext import commands
-from core.globals import conversation_histories, SYSTEM_PROMPT_TEACHER, create_mood_prompt, update_mood, get_llm_config, cleanup_old_conversations
+from core.globals import conversation_histories, SYSTEM_PROMPT_TEACHER, create_mood_prompt, update_mood, get_llm_config, STREAMING_ENABLED, SENSEI_CACHE_TTL
+from core.history import pack_history, summary_messages
+from core.summarizer import history_compactor
+from core.llm import llm_gateway
+from core.admission import AdmissionRejected
+from core.circuit import CircuitOpenError
+from core.ratelimit import rate_limit
+from core.streaming import StreamingReply, split_message
+from core.cache import sensei_cache, normalize_question, is_follow_up
+from core.semantic import sensei_semantic_index
+from core.keywords import analyze_message
 from core.gamification import gamification, get_level_title
 
+EMPTY_ANSWER_REPLY = "🤔 Sensei belum menemukan jawabannya. Coba tanyakan dengan kalimat lain ya!"
+
 def clean_response(text):
     """Remove unwanted content like think tags from AI responses"""
     # Remove <think>...</think> blocks
@@ -22,7 +31,7 @@ def clean_response(text):
 
 def setup_sensei_command(bot):
     @bot.command(name='sensei')
-    @commands.cooldown(rate=3, per=60, type=commands.BucketType.user)
+    @rate_limit(rate=3, per=60)
     async def ask_tutor_to_cat(ctx, *, message=None):
         user_id = ctx.author.id
         
@@ -70,103 +79,128 @@ def setup_sensei_command(bot):
             await ctx.reply(embed=embed)
             return
         
-        if user_id not in conversation_histories['sensei']:
-            conversation_histories['sensei'][user_id] = []
-
         # Add the user's message to the conversation history
-        conversation_histories['sensei'][user_id].append({"role": "user", "content": message})
+        history = conversation_histories['sensei'].get_or_create(user_id)
+        history.append({"role": "user", "content": message})
 
         mood = update_mood(user_id, 'sensei')
+        config = get_llm_config()
 
+        # Compacted memory of older turns, then recent turns that fit the model's
+        # history budget (current message excluded)
+        context_messages = [
+            *summary_messages(history),
+            *pack_history(
+                history,
+                config['settings']['sensei']['history_tokens'],
+                skip_latest=1
+            )
+        ]
         conversation = [
             {"role": "system", "content": SYSTEM_PROMPT_TEACHER},
             {"role": "system", "content": create_mood_prompt(mood)},
+            *context_messages,
             {"role": "user", "content": message}
         ]
 
-        try:
-            config = get_llm_config()
-            
-            # Show typing indicator while processing
-            async with ctx.typing():
-                # Use OpenAI client with custom base_url for Perplexity
-                client = openai.OpenAI(
-                    api_key=config['api_key'],
-                    base_url=config['base_url'] if config['base_url'] else "https://api.openai.com/v1",
-                    timeout=30.0  # Set 30 second timeout
-                )
+        # Repeated questions are answered from cache without touching the model. A
+        # follow-up like "kenapa?" or "contohnya?" depends on this user's conversation,
+        # so only questions that stand on their own are shared
+        cacheable = not is_follow_up(message)
+        normalized_question = normalize_question(message)
+        # Look up under the provider that would answer now; store under the one that did
+        lookup_config = get_llm_config(llm_gateway.primary_provider())
+        cache_scope = f"{lookup_config['provider']}:{lookup_config['models']['sensei']}"
+        cache_key = sensei_cache.make_key(normalized_question, lookup_config['models']['sensei'], lookup_config['provider'])
 
-                # Use asyncio to prevent blocking Discord's heartbeat
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: client.chat.completions.create(
-                        model=config['models']['sensei'],
-                        messages=conversation,
-                        max_tokens=1500,
-                        temperature=0.6
-                    )
-                )
-                answer = response.choices[0].message.content
+        try:
+            answer = sensei_cache.get(cache_key) if cacheable else None
+            if answer is None and cacheable:
+                # Reworded versions of an answered question count too
+                similar_key = sensei_semantic_index.lookup(normalized_question, cache_scope)
+                if similar_key:
+                    answer = sensei_cache.get(similar_key, record=False)
+            streamed = False
+            
+            if answer is None:
+                served = {}
+                # Show typing indicator while processing
+                async with ctx.typing():
+                    if STREAMING_ENABLED:
+                        # Edit the reply as tokens arrive so the first words show up right away
+                        reply = StreamingReply(ctx, clean=clean_response)
+                        async for delta in llm_gateway.stream_chat(
+                            'sensei',
+                            conversation,
+                            served=served
+                        ):
+                            await reply.feed(delta)
+                        answer = await reply.finish()
+                        streamed = True
+                    else:
+                        # Shared gateway reuses one pooled async client per provider
+                        answer = await llm_gateway.chat(
+                            'sensei',
+                            conversation,
+                            served=served
+                        )
+                        
+                        # Clean up response - remove think tags and unwanted content
+                        answer = clean_response(answer)
                 
-                # Clean up response - remove think tags and unwanted content
-                answer = clean_response(answer)
+                if answer and cacheable and served:
+                    served_key = sensei_cache.make_key(normalized_question, served['model'], served['provider'])
+                    sensei_cache.set(served_key, answer)
+                    sensei_semantic_index.add(
+                        normalized_question, served_key, f"{served['provider']}:{served['model']}", SENSEI_CACHE_TTL
+                    )
+            
+            if not answer:
+                # Nothing visible came back (e.g. only a think block): say so, and don't
+                # keep an empty turn or grant EXP for it
+                if streamed:
+                    await reply.finish(fallback=EMPTY_ANSWER_REPLY)
+                else:
+                    await ctx.reply(EMPTY_ANSWER_REPLY)
+                return
             
             # Note: Citations would be in response metadata if available
             # Perplexity citations handling can be added when API supports it
             
-            # Handle long messages by chunking them
-            if len(answer) <= 2000:
-                await ctx.reply(answer)
-            else:
-                # Split into chunks of 2000 characters or less
-                chunks = []
-                current_chunk = ""
-                
-                for line in answer.split('\n'):
-                    if len(current_chunk + line + '\n') <= 1900:  # Leave room for safety
-                        current_chunk += line + '\n'
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = line + '\n'
-                
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                
-                # Send first chunk as reply, rest as follow-up messages
-                if chunks:
-                    await ctx.reply(chunks[0])
-                    for chunk in chunks[1:]:
-                        await ctx.send(chunk)
+            if not streamed:
+                # Handle long messages by chunking them
+                if len(answer) <= 2000:
+                    await ctx.reply(answer)
+                else:
+                    # Send first chunk as reply, rest as follow-up messages
+                    chunks = split_message(answer)
+                    if chunks:
+                        await ctx.reply(chunks[0])
+                        for chunk in chunks[1:]:
+                            await ctx.send(chunk)
 
             # Store the assistant's reply in history
-            conversation_histories['sensei'][user_id].append({"role": "assistant", "content": answer})
+            history.append({"role": "assistant", "content": answer})
+            
+            # Fold older turns into a summary in the background (never delays this reply)
+            history_compactor.maybe_schedule('sensei', user_id)
             
             # Add gamification rewards for educational interactions
             base_exp = 15  # Higher base EXP for learning
             
-            # Bonus for educational keywords
-            educational_bonus = 0
-            message_lower = message.lower()
-            
-            educational_keywords = ['why', 'how', 'what', 'explain', 'teach', 'learn', 'study', 'understand', 'help']
-            for keyword in educational_keywords:
-                if keyword in message_lower:
-                    educational_bonus += 2
-                    break
-            
-            # Bonus for question marks (asking questions)
-            if '?' in message:
-                educational_bonus += 3
-            
-            # Track sensei interactions
-            gamification.increment_stat(str(ctx.author.id), 'sensei_interactions')
+            # Bonus for educational keywords and questions, from one keyword pass
+            educational_bonus = analyze_message(message).sensei_bonus
             
+            # Track the sensei interaction and EXP in one batched update
             total_exp = base_exp + educational_bonus
-            exp_result = gamification.add_exp(str(ctx.author.id), total_exp, "sensei_session")
+            rewards = gamification.apply_events(str(ctx.author.id), [
+                {"interaction": "sensei"},
+                {"exp": total_exp, "source": "sensei_session"}
+            ])
+            exp_result = rewards["exp"]
             
             # Show level up notification
-            if exp_result["level_ups"] > 0:
+            if exp_result and exp_result["level_ups"] > 0:
                 level_title = get_level_title(exp_result["new_level"])
                 level_up_msg = f"\n\n📚 **KNOWLEDGE LEVEL UP!** 📚\n🎓 {ctx.author.display_name} advanced to Level {exp_result['new_level']} - {level_title}! 🎓"
                 try:
@@ -174,22 +208,20 @@ def setup_sensei_command(bot):
                 except:
                     pass
             
-            # Check for new achievements
-            new_achievements = gamification.check_achievements(str(ctx.author.id))
-            if new_achievements:
-                for ach_id in new_achievements:
-                    achievement = gamification.achievements[ach_id]
-                    ach_msg = f"\n🏆 **ACHIEVEMENT UNLOCKED!** 🏆\n{achievement['icon']} **{achievement['name']}**\n{achievement['description']} (+{achievement['exp']} EXP)"
-                    try:
-                        await ctx.channel.send(ach_msg)
-                    except:
-                        pass
-            
-            # Periodic cleanup (10% chance after each interaction)
-            if random.random() < 0.1:
-                cleanup_old_conversations()
+            # Announce new achievements
+            for unlocked in rewards["achievements"]:
+                achievement = unlocked["achievement"]
+                ach_msg = f"\n🏆 **ACHIEVEMENT UNLOCKED!** 🏆\n{achievement['icon']} **{achievement['name']}**\n{achievement['description']} (+{unlocked['exp_reward']} EXP)"
+                try:
+                    await ctx.channel.send(ach_msg)
+                except:
+                    pass
         except asyncio.TimeoutError:
             await ctx.reply("⏱️ Sensei membutuhkan waktu terlalu lama untuk berpikir. Coba lagi ya!")
+        except CircuitOpenError:
+            await ctx.reply("🔧 Sensei sedang tidak bisa dihubungi. Coba lagi beberapa saat lagi ya!")
+        except AdmissionRejected as e:
+            await ctx.reply(f"📚 Sensei sedang melayani banyak murid. Coba lagi dalam {max(1, round(e.retry_after))} detik ya!")
         except Exception as e:
             print(f"Sensei command error: {type(e).__name__}: {str(e)}")  # Debug logging
             await ctx.reply(f"Sensei error terjadi! ({type(e).__name__})")
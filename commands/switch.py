@@ -2,6 +2,7 @@ import os
 import discord
 from discord.ext import commands
 from core.globals import LLM_PROVIDER
+from core.llm import llm_gateway
 
 def setup_switch_command(bot):
     @bot.command(name='switch')
@@ -43,6 +44,9 @@ def setup_switch_command(bot):
         import core.globals as globals_module
         globals_module.LLM_PROVIDER = provider
         
+        # Rebuild the pooled LLM clients on the next call
+        llm_gateway.reset()
+        
         # Success message
         emoji = "🤖" if provider == 'openai' else "🔍"
         color = 0x00ff00 if provider == 'openai' else 0xff6600
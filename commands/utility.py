@@ -1,10 +1,17 @@
 import discord
 from discord.ext import commands
-from core.globals import reset_user_state, get_user_stats, cleanup_old_conversations, conversation_histories, user_moods
+from core.globals import (
+    reset_user_state, get_user_stats, cleanup_old_conversations, conversation_histories, user_moods, session_budget,
+    MAX_CONVERSATION_HISTORY, SESSION_TTL
+)
+from core.cache import sensei_cache, vtuber_cache
+from core.semantic import sensei_semantic_index
+from core.ratelimit import rate_limit
+from core.scheduler import maintenance
 
 def setup_utility_commands(bot):
     @bot.command(name='reset')
-    @commands.cooldown(rate=1, per=300, type=commands.BucketType.user)  # 1 time per 5 minutes
+    @rate_limit(rate=1, per=300)  # 1 time per 5 minutes
     async def reset_user_data(ctx, context=None):
         """Reset your conversation history and mood for miaw, sensei, or both"""
         user_id = ctx.author.id
@@ -48,7 +55,7 @@ def setup_utility_commands(bot):
             await ctx.reply(embed=embed)
 
     @bot.command(name='stats', aliases=['mystats'])
-    @commands.cooldown(rate=2, per=60, type=commands.BucketType.user)
+    @rate_limit(rate=2, per=60)
     async def user_statistics(ctx, target_user: discord.Member = None):
         """Show your interaction statistics with the bot"""
         
@@ -119,35 +126,27 @@ def setup_utility_commands(bot):
         """Manually trigger conversation history cleanup (Admin only)"""
         
         # Count conversations before cleanup
-        total_before = 0
-        for context in conversation_histories.values():
-            for user_conversations in context.values():
-                total_before += len(user_conversations)
+        total_before = sum(len(store) for store in conversation_histories.values())
         
         # Perform cleanup
-        cleanup_old_conversations()
+        cleaned = cleanup_old_conversations()
         
         # Count conversations after cleanup
-        total_after = 0
-        for context in conversation_histories.values():
-            for user_conversations in context.values():
-                total_after += len(user_conversations)
-        
-        cleaned = total_before - total_after
+        total_after = sum(len(store) for store in conversation_histories.values())
         
         embed = discord.Embed(
             title="🧹 Cleanup Complete",
-            description="Old conversation histories have been cleaned up!",
+            description="Idle conversation sessions have been cleaned up!",
             color=0x00ff00
         )
         embed.add_field(
             name="Results:",
-            value=f"**Before:** {total_before} total messages\n**After:** {total_after} total messages\n**Cleaned:** {cleaned} old messages",
+            value=f"**Before:** {total_before} conversations\n**After:** {total_after} conversations\n**Cleaned:** {cleaned} idle sessions",
             inline=False
         )
         embed.add_field(
             name="Info:",
-            value=f"Conversations are limited to {10} messages per user to prevent memory issues.",
+            value=f"Conversations keep the last {MAX_CONVERSATION_HISTORY} messages and are dropped after {SESSION_TTL // 3600} hours without activity.",
             inline=False
         )
         
@@ -195,6 +194,57 @@ def setup_utility_commands(bot):
             inline=True
         )
         
+        # Bounded session stores (LRU past the user cap, dropped after the idle TTL)
+        session_lines = []
+        for name, store in [("Miaw chats", conversation_histories['miaw']), ("Sensei chats", conversation_histories['sensei']),
+                            ("Miaw moods", user_moods['miaw']), ("Sensei moods", user_moods['sensei'])]:
+            store_stats = store.stats()
+            session_lines.append(
+                f"**{name}:** {store_stats['size']}/{store_stats['max_entries']} users • "
+                f"{store_stats['evictions']} evicted • {store_stats['expirations']} expired"
+            )
+        budget_stats = session_budget.stats()
+        session_lines.append(
+            f"**Memory:** ~{budget_stats['used']:,}/{budget_stats['max_tokens']:,} tokens • "
+            f"{budget_stats['evictions']} evicted"
+        )
+        embed.add_field(
+            name="🧠 Sessions",
+            value="\n".join(session_lines),
+            inline=False
+        )
+        
+        # Response cache effectiveness
+        cache_lines = []
+        for name, cache in [("Sensei", sensei_cache), ("VTuber", vtuber_cache)]:
+            cache_stats = cache.stats()
+            cache_lines.append(
+                f"**{name}:** {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.0%}) • {cache_stats['size']} cached"
+            )
+        cache_lines.append(
+            f"**Sensei (similar):** {sensei_semantic_index.hits} hits / {sensei_semantic_index.lookups} lookups "
+            f"• {len(sensei_semantic_index)} indexed"
+        )
+        embed.add_field(
+            name="🗃️ Response Cache",
+            value="\n".join(cache_lines),
+            inline=False
+        )
+        
+        # Background maintenance jobs
+        job_stats = maintenance.stats()
+        if job_stats:
+            embed.add_field(
+                name="🧹 Maintenance",
+                value="\n".join(
+                    f"**{name}:** {stats['runs']} runs • {stats['overruns']} overruns • "
+                    f"max slice {stats['max_slice_ms']:.1f}ms"
+                    for name, stats in job_stats.items()
+                ),
+                inline=False
+            )
+        
         embed.set_footer(text="Use !cleanup to clean old conversations")
         await ctx.reply(embed=embed)
 
@@ -1,16 +1,26 @@
 import discord
-import openai
 import re
 import asyncio
-import random
 from discord.ext import commands
-from core.globals import get_llm_config, cleanup_old_conversations
+from core.globals import get_llm_config, STREAMING_ENABLED, VTUBER_CACHE_TTL
+from core.cache import vtuber_cache
+from core.llm import llm_gateway
+from core.admission import AdmissionRejected
+from core.circuit import CircuitOpenError
+from core.ratelimit import rate_limit
+from core.streaming import StreamingReply, split_message
 from core.gamification import gamification, get_level_title
 
-async def handle_vtuber_rewards(ctx, exp_result):
-    """Handle gamification rewards for VTuber commands"""
+async def handle_vtuber_rewards(ctx, exp, source):
+    """Grant VTuber command rewards in one batched update and announce level ups/achievements"""
+    rewards = gamification.apply_events(str(ctx.author.id), [
+        {"interaction": "vtuber"},
+        {"exp": exp, "source": source}
+    ])
+    exp_result = rewards["exp"]
+    
     # Show level up notification
-    if exp_result["level_ups"] > 0:
+    if exp_result and exp_result["level_ups"] > 0:
         level_title = get_level_title(exp_result["new_level"])
         level_up_msg = f"🎬 **VTUBER LEVEL UP!** 🎬\n⭐ {ctx.author.display_name} reached Level {exp_result['new_level']} - {level_title}! ⭐"
         try:
@@ -18,16 +28,14 @@ async def handle_vtuber_rewards(ctx, exp_result):
         except:
             pass
     
-    # Check for new achievements
-    new_achievements = gamification.check_achievements(str(ctx.author.id))
-    if new_achievements:
-        for ach_id in new_achievements:
-            achievement = gamification.achievements[ach_id]
-            ach_msg = f"🏆 **ACHIEVEMENT UNLOCKED!** 🏆\n{achievement['icon']} **{achievement['name']}**\n{achievement['description']} (+{achievement['exp']} EXP)"
-            try:
-                await ctx.channel.send(ach_msg)
-            except:
-                pass
+    # Announce new achievements
+    for unlocked in rewards["achievements"]:
+        achievement = unlocked["achievement"]
+        ach_msg = f"🏆 **ACHIEVEMENT UNLOCKED!** 🏆\n{achievement['icon']} **{achievement['name']}**\n{achievement['description']} (+{unlocked['exp_reward']} EXP)"
+        try:
+            await ctx.channel.send(ach_msg)
+        except:
+            pass
 
 def clean_response(text):
     """Remove unwanted content like think tags from AI responses"""
@@ -43,45 +51,71 @@ def clean_response(text):
     
     return text
 
-async def get_vtuber_response(prompt, context="vtuber"):
-    """Get response from AI with VTuber-specific context"""
-    try:
-        config = get_llm_config()
-        
-        # Use OpenAI client with custom base_url for Perplexity
-        client = openai.OpenAI(
-            api_key=config['api_key'],
-            base_url=config['base_url'] if config['base_url'] else "https://api.openai.com/v1",
-            timeout=30.0
+VTUBER_SYSTEM_PROMPT = "You are a helpful assistant specializing in Indonesian VTuber industry and content creation. Always provide current, accurate information with sources when possible. Respond in Indonesian unless specifically asked otherwise."
+
+def build_vtuber_messages(prompt):
+    """Build the chat messages for a VTuber research prompt"""
+    return [
+        {"role": "system", "content": VTUBER_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+async def get_vtuber_response(prompt, reply=None):
+    """Get response from AI with VTuber-specific context, streaming into reply if given"""
+    if reply is None:
+        answer = await llm_gateway.chat(
+            'sensei',  # Use sensei model for research tasks
+            build_vtuber_messages(prompt)
         )
-
-        # Use asyncio to prevent blocking Discord's heartbeat
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: client.chat.completions.create(
-                model=config['models']['sensei'],  # Use sensei model for research tasks
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant specializing in Indonesian VTuber industry and content creation. Always provide current, accurate information with sources when possible. Respond in Indonesian unless specifically asked otherwise."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.6
-            )
-        )
-        
-        answer = response.choices[0].message.content
         return clean_response(answer)
-        
+    
+    async for delta in llm_gateway.stream_chat(
+        'sensei',  # Use sensei model for research tasks
+        build_vtuber_messages(prompt)
+    ):
+        await reply.feed(delta)
+    return reply.visible_text()
+
+async def send_vtuber_response(ctx, prompt, make_embed):
+    """Answer a VTuber research prompt from cache, or fetch it once for everyone asking"""
+    config = get_llm_config()
+    cache_key = vtuber_cache.make_key(prompt, config['models']['sensei'], config['provider'])
+    ttl = VTUBER_CACHE_TTL.get(ctx.command.name if ctx.command else None, vtuber_cache.default_ttl)
+    
+    # Only the caller that actually hits the API streams; the rest get the finished answer
+    reply = StreamingReply(ctx, clean=clean_response, embed_factory=make_embed) if STREAMING_ENABLED else None
+    
+    try:
+        async with ctx.typing():
+            response = await vtuber_cache.get_or_compute(
+                cache_key,
+                lambda: get_vtuber_response(prompt, reply),
+                ttl
+            )
     except asyncio.TimeoutError:
-        return "⏱️ Maaf, permintaan membutuhkan waktu terlalu lama. Coba lagi ya!"
+        response = "⏱️ Maaf, permintaan membutuhkan waktu terlalu lama. Coba lagi ya!"
+    except CircuitOpenError:
+        response = "🔧 Layanan AI sedang gangguan. Coba lagi beberapa saat lagi ya!"
+    except AdmissionRejected as e:
+        response = f"⏳ Lagi banyak yang request nih. Coba lagi dalam {max(1, round(e.retry_after))} detik ya!"
     except Exception as e:
         print(f"VTuber command error: {type(e).__name__}: {str(e)}")
-        return f"❌ Terjadi error: {type(e).__name__}"
+        response = f"❌ Terjadi error: {type(e).__name__}"
+    
+    if reply and reply.started:
+        return await reply.finish(fallback=response)
+    
+    # First chunk goes in the embed, the rest as follow-up messages
+    chunks = split_message(response) or [response]
+    await ctx.reply(embed=make_embed(chunks[0]))
+    for chunk in chunks[1:]:
+        await ctx.send(chunk)
+    return response
 
 def setup_vtuber_commands(bot):
     
     @bot.command(name='vtubernews')
-    @commands.cooldown(rate=2, per=120, type=commands.BucketType.user)
+    @rate_limit(rate=2, per=120)
     async def vtuber_news(ctx):
         """Get latest Indonesian VTuber news and updates"""
         
@@ -105,41 +139,22 @@ def setup_vtuber_commands(bot):
         Maksimal 1500 karakter.
         """
         
-        async with ctx.typing():
-            response = await get_vtuber_response(prompt)
-            
-        # Handle long messages by chunking
-        if len(response) <= 2000:
+        def make_embed(text):
             embed = discord.Embed(
                 title="📺 VTuber Indonesia News Update",
-                description=response,
+                description=text,
                 color=0xff69b4
             )
             embed.set_footer(text="Use !trending untuk konten viral • !gametrends untuk game populer")
-            await ctx.reply(embed=embed)
-        else:
-            # Split into chunks
-            chunks = [response[i:i+1900] for i in range(0, len(response), 1900)]
-            
-            embed = discord.Embed(
-                title="📺 VTuber Indonesia News Update",
-                description=chunks[0],
-                color=0xff69b4
-            )
-            await ctx.reply(embed=embed)
-            
-            for chunk in chunks[1:]:
-                await ctx.send(chunk)
+            return embed
         
-        # Add gamification rewards for VTuber command usage
-        gamification.increment_stat(str(ctx.author.id), 'vtuber_commands')
-        exp_result = gamification.add_exp(str(ctx.author.id), 12, "vtuber_news")
+        await send_vtuber_response(ctx, prompt, make_embed)
         
-        # Check for level ups and achievements
-        await handle_vtuber_rewards(ctx, exp_result)
+        # Add gamification rewards for VTuber command usage
+        await handle_vtuber_rewards(ctx, 12, "vtuber_news")
 
     @bot.command(name='trending')
-    @commands.cooldown(rate=2, per=120, type=commands.BucketType.user)
+    @rate_limit(rate=2, per=120)
     async def trending_indonesia(ctx, platform: str = None):
         """Get trending topics in Indonesia for VTuber content"""
         
@@ -204,30 +219,27 @@ def setup_vtuber_commands(bot):
         Format dengan emoji dan maksimal 1500 karakter.
         """
         
-        async with ctx.typing():
-            response = await get_vtuber_response(prompt)
-        
-        embed = discord.Embed(
-            title=f"🔥 Trending Indonesia - {platform_display}",
-            description=response,
-            color=0x1da1f2 if platform_lower in ['x', 'twitter'] else 0xff6b6b
-        )
-        
-        # Add platform-specific footer
-        if platform_lower in ['x', 'twitter']:
-            embed.set_footer(text="💡 X/Twitter adalah platform utama VTuber Indonesia • !gametrends untuk game populer")
-        else:
-            embed.set_footer(text="Use !trending untuk X/Twitter trends • !gametrends untuk game populer")
+        def make_embed(text):
+            embed = discord.Embed(
+                title=f"🔥 Trending Indonesia - {platform_display}",
+                description=text,
+                color=0x1da1f2 if platform_lower in ['x', 'twitter'] else 0xff6b6b
+            )
+            
+            # Add platform-specific footer
+            if platform_lower in ['x', 'twitter']:
+                embed.set_footer(text="💡 X/Twitter adalah platform utama VTuber Indonesia • !gametrends untuk game populer")
+            else:
+                embed.set_footer(text="Use !trending untuk X/Twitter trends • !gametrends untuk game populer")
+            return embed
         
-        await ctx.reply(embed=embed)
+        await send_vtuber_response(ctx, prompt, make_embed)
         
         # Add gamification rewards
-        gamification.increment_stat(str(ctx.author.id), 'vtuber_commands')
-        exp_result = gamification.add_exp(str(ctx.author.id), 10, "trending_check")
-        await handle_vtuber_rewards(ctx, exp_result)
+        await handle_vtuber_rewards(ctx, 10, "trending_check")
 
     @bot.command(name='gametrends')
-    @commands.cooldown(rate=2, per=120, type=commands.BucketType.user)
+    @rate_limit(rate=2, per=120)
     async def game_trends(ctx, category: str = None):
         """Get trending games popular among Indonesian gamers and VTubers"""
         
@@ -273,24 +285,22 @@ def setup_vtuber_commands(bot):
         Format dengan emoji dan struktur rapi. Maksimal 1500 karakter.
         """
         
-        async with ctx.typing():
-            response = await get_vtuber_response(prompt)
+        def make_embed(text):
+            embed = discord.Embed(
+                title=f"🎮 Game Trends Indonesia{f' - {category.title()}' if category else ''}",
+                description=text,
+                color=0x00ff00
+            )
+            embed.set_footer(text="Use !collab untuk opportunities • !culture untuk konten budaya")
+            return embed
         
-        embed = discord.Embed(
-            title=f"🎮 Game Trends Indonesia{f' - {category.title()}' if category else ''}",
-            description=response,
-            color=0x00ff00
-        )
-        embed.set_footer(text="Use !collab untuk opportunities • !culture untuk konten budaya")
-        await ctx.reply(embed=embed)
+        await send_vtuber_response(ctx, prompt, make_embed)
         
         # Add gamification rewards
-        gamification.increment_stat(str(ctx.author.id), 'vtuber_commands')
-        exp_result = gamification.add_exp(str(ctx.author.id), 10, "game_trends")
-        await handle_vtuber_rewards(ctx, exp_result)
+        await handle_vtuber_rewards(ctx, 10, "game_trends")
 
     @bot.command(name='culture', aliases=['budaya'])
-    @commands.cooldown(rate=2, per=120, type=commands.BucketType.user)
+    @rate_limit(rate=2, per=120)
     async def indonesian_culture(ctx, region: str = None):
         """Get Indonesian cultural content ideas for VTubers"""
         
@@ -342,24 +352,22 @@ def setup_vtuber_commands(bot):
         Format engaging dengan emoji. Maksimal 1500 karakter.
         """
         
-        async with ctx.typing():
-            response = await get_vtuber_response(prompt)
+        def make_embed(text):
+            embed = discord.Embed(
+                title=f"🏛️ Konten Budaya Indonesia{f' - {region.title()}' if region else ''}",
+                description=text,
+                color=0xffd700
+            )
+            embed.set_footer(text="Use !collab untuk networking • !trending untuk topik viral")
+            return embed
         
-        embed = discord.Embed(
-            title=f"🏛️ Konten Budaya Indonesia{f' - {region.title()}' if region else ''}",
-            description=response,
-            color=0xffd700
-        )
-        embed.set_footer(text="Use !collab untuk networking • !trending untuk topik viral")
-        await ctx.reply(embed=embed)
+        await send_vtuber_response(ctx, prompt, make_embed)
         
         # Add gamification rewards
-        gamification.increment_stat(str(ctx.author.id), 'vtuber_commands')
-        exp_result = gamification.add_exp(str(ctx.author.id), 10, "culture_content")
-        await handle_vtuber_rewards(ctx, exp_result)
+        await handle_vtuber_rewards(ctx, 10, "culture_content")
 
     @bot.command(name='collab')
-    @commands.cooldown(rate=2, per=180, type=commands.BucketType.user)
+    @rate_limit(rate=2, per=180)
     async def collaboration_opportunities(ctx, collab_type: str = None):
         """Get collaboration opportunities for Indonesian VTubers"""
         
@@ -417,21 +425,19 @@ def setup_vtuber_commands(bot):
         Format professional tapi engaging. Maksimal 1600 karakter.
         """
         
-        async with ctx.typing():
-            response = await get_vtuber_response(prompt)
+        def make_embed(text):
+            embed = discord.Embed(
+                title=f"🤝 Collaboration Opportunities{f' - {collab_type.title()}' if collab_type else ''}",
+                description=text,
+                color=0x9b59b6
+            )
+            embed.set_footer(text="Use !vtubernews untuk update terbaru • Selalu verifikasi opportunities!")
+            return embed
         
-        embed = discord.Embed(
-            title=f"🤝 Collaboration Opportunities{f' - {collab_type.title()}' if collab_type else ''}",
-            description=response,
-            color=0x9b59b6
-        )
-        embed.set_footer(text="Use !vtubernews untuk update terbaru • Selalu verifikasi opportunities!")
-        await ctx.reply(embed=embed)
+        await send_vtuber_response(ctx, prompt, make_embed)
         
         # Add gamification rewards
-        gamification.increment_stat(str(ctx.author.id), 'vtuber_commands')
-        exp_result = gamification.add_exp(str(ctx.author.id), 15, "collaboration_networking")  # Higher EXP for networking
-        await handle_vtuber_rewards(ctx, exp_result)
+        await handle_vtuber_rewards(ctx, 15, "collaboration_networking")  # Higher EXP for networking
 
     # Error handlers for all VTuber commands
     @vtuber_news.error
@@ -444,11 +450,4 @@ def setup_vtuber_commands(bot):
             await ctx.reply(f"⏱️ Command ini masih cooldown. Coba lagi dalam {error.retry_after:.0f} detik.")
         else:
             print(f"VTuber command error: {error}")
-            await ctx.reply("❌ Terjadi error saat memproses command. Coba lagi ya!")
-
-    # Periodic cleanup (10% chance after each VTuber interaction)
-    @bot.event
-    async def on_command_completion(ctx):
-        if ctx.command and ctx.command.name in ['vtubernews', 'trending', 'gametrends', 'culture', 'collab']:
-            if random.random() < 0.1:
-                cleanup_old_conversations()
\ No newline at end of file
+            await ctx.reply("❌ Terjadi error saat memproses command. Coba lagi ya!")
\ No newline at end of file
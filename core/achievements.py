@@ -0,0 +1,119 @@
+import bisect
+import operator
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from core.leaderboard import profile_score
+
+COMPARATORS: Dict[str, Callable[[int, int], bool]] = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "==": operator.eq,
+    "<=": operator.le,
+    "<": operator.lt
+}
+
+# Rules for the original hard-coded achievements, used when a definition has none
+LEGACY_RULES = {
+    "first_chat": {"stat": "miaw_interactions", "op": ">=", "value": 1},
+    "chatty": {"stat": "miaw_interactions", "op": ">=", "value": 10},
+    "pat_master": {"stat": "pat_count", "op": ">=", "value": 15}
+}
+
+
+class Rule:
+    """A compiled achievement condition"""
+
+    def __init__(self, check: Callable[[Dict], bool], stats: Set[str]):
+        self.check = check
+        self.stats = stats  # Profile fields the rule reads
+
+
+def compile_rule(spec: Dict) -> Rule:
+    """Compile {"stat", "op", "value"} or {"all": [...]} / {"any": [...]} into a Rule"""
+    for combinator, combine in (("all", all), ("any", any)):
+        if combinator in spec:
+            parts = [compile_rule(part) for part in spec[combinator]]
+            if not parts:
+                raise ValueError(f"Empty '{combinator}' rule")
+            return Rule(
+                lambda profile, parts=parts, combine=combine: combine(part.check(profile) for part in parts),
+                set().union(*(part.stats for part in parts))
+            )
+
+    stat, op, value = spec["stat"], spec.get("op", ">="), spec["value"]
+    compare = COMPARATORS.get(op)
+    if compare is None:
+        raise ValueError(f"Unknown comparator '{op}' in rule for {stat}")
+    return Rule(lambda profile: compare(profile_score(profile, stat), value), {stat})
+
+
+class AchievementEngine:
+    """Evaluates only the achievements whose input stats changed
+
+    Plain ">=" rules sit in a per-stat list sorted by threshold, so a check is
+    one bisect plus the newly reached thresholds: walking down from the highest
+    one reached stops at the first the profile owns. Anything else (other
+    comparators, all/any) is evaluated in full when one of its stats changes.
+    """
+
+    def __init__(self, achievements: Dict[str, Dict]):
+        self.thresholds: Dict[str, List[int]] = {}
+        self.threshold_ids: Dict[str, List[str]] = {}
+        self.complex_rules: Dict[str, List[str]] = {}
+        self.rules: Dict[str, Rule] = {}
+
+        simple = {}
+        for ach_id, achievement in achievements.items():
+            spec = achievement.get("rule") or LEGACY_RULES.get(ach_id)
+            if spec is None:
+                print(f"⚠️ Achievement '{ach_id}' has no rule, it can't be earned")
+                continue
+            try:
+                self.rules[ach_id] = compile_rule(spec)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"⚠️ Invalid rule for achievement '{ach_id}': {e}")
+                continue
+
+            if "stat" in spec and spec.get("op", ">=") == ">=":
+                simple.setdefault(spec["stat"], []).append((spec["value"], ach_id))
+            else:
+                for stat in self.rules[ach_id].stats:
+                    self.complex_rules.setdefault(stat, []).append(ach_id)
+
+        for stat, entries in simple.items():
+            entries.sort()
+            self.thresholds[stat] = [value for value, _ in entries]
+            self.threshold_ids[stat] = [ach_id for _, ach_id in entries]
+
+    def evaluate(self, profile: Dict, changed: Optional[Iterable[str]] = None) -> List[str]:
+        """Achievement ids the profile now qualifies for but doesn't own yet
+
+        changed limits the check to rules reading those stats; None checks everything,
+        including thresholds below one already owned (e.g. added to the catalog later).
+        """
+        owned = profile.get("achievements", ())  # Bitset view on Profile, O(1) membership
+        earned = []
+        seen = set()
+        stats = self.rules_stats() if changed is None else changed
+        for stat in stats:
+            thresholds = self.thresholds.get(stat)
+            if thresholds:
+                ids = self.threshold_ids[stat]
+                newly = []
+                for index in range(bisect.bisect_right(thresholds, profile_score(profile, stat)) - 1, -1, -1):
+                    if ids[index] in owned:
+                        if changed is not None:
+                            break  # Lower thresholds were earned on the way up
+                    elif ids[index] not in seen:
+                        seen.add(ids[index])
+                        newly.append(ids[index])
+                earned.extend(reversed(newly))
+            for ach_id in self.complex_rules.get(stat, ()):
+                if ach_id not in owned and ach_id not in seen and self.rules[ach_id].check(profile):
+                    seen.add(ach_id)
+                    earned.append(ach_id)
+        return earned
+
+    def rules_stats(self) -> Set[str]:
+        """Every stat some rule depends on"""
+        return set(self.thresholds) | set(self.complex_rules)
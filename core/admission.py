@@ -0,0 +1,206 @@
+import asyncio
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from core.globals import ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call can't be admitted before its deadline"""
+
+    def __init__(self, provider: str, model: str, retry_after: float = 0.0):
+        super().__init__(f"{provider}/{model} is saturated, retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.model = model
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until amount tokens are available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def clamp(self, remaining: float, now: float):
+        """Never believe we have more headroom than the provider says we do"""
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+
+class ProviderLimits:
+    """Request and token buckets plus the wait queue for one provider model"""
+
+    def __init__(self, settings: Dict):
+        self.requests = TokenBucket(settings.get('requests_per_minute', 60))
+        self.tokens = TokenBucket(settings.get('tokens_per_minute', 100000))
+        self.blocked_until = 0.0  # Set from Retry-After on 429s
+        self.lock = asyncio.Lock()  # FIFO line for waiters
+        self.waiting = 0
+
+    def time_until(self, tokens: int, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.requests.time_until(1, now),
+            self.tokens.time_until(tokens, now)
+        )
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a rate-limit duration like '20ms', '1s', '6m0s' or a Retry-After value"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if parts:
+        scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+    # Retry-After may also be an HTTP date
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdmissionController:
+    """Gate every outbound LLM call behind per-provider rate limits"""
+
+    def __init__(self, max_queue: int = ADMISSION_MAX_QUEUE, max_wait: float = ADMISSION_MAX_WAIT):
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._limits: Dict[tuple, ProviderLimits] = {}
+        self.rejected = 0
+
+    def _get_limits(self, provider: str, model: str, settings: Dict) -> ProviderLimits:
+        key = (provider, model)
+        if key not in self._limits:
+            self._limits[key] = ProviderLimits(settings)
+        return self._limits[key]
+
+    async def acquire(self, provider: str, model: str, settings: Dict, tokens: int,
+                      max_wait: Optional[float] = None) -> int:
+        """Wait for a slot, or raise AdmissionRejected if it can't come before the deadline"""
+        limits = self._get_limits(provider, model, settings)
+        now = time.monotonic()
+        deadline = now + (self.max_wait if max_wait is None else max_wait)
+
+        # Fast path: nobody queued and capacity available right now
+        if not limits.lock.locked() and limits.time_until(tokens, now) == 0:
+            limits.requests.take(1, now)
+            limits.tokens.take(tokens, now)
+            return tokens
+
+        if limits.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(provider, model, limits.time_until(tokens, time.monotonic()))
+
+        limits.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(limits.lock.acquire(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(provider, model, limits.time_until(tokens, time.monotonic()))
+
+            try:
+                now = time.monotonic()
+                wait = limits.time_until(tokens, now)
+                if now + wait > deadline:
+                    self.rejected += 1
+                    raise AdmissionRejected(provider, model, wait)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    now = time.monotonic()
+                limits.requests.take(1, now)
+                limits.tokens.take(tokens, now)
+                return tokens
+            finally:
+                limits.lock.release()
+        finally:
+            limits.waiting -= 1
+
+    def busy(self, provider: str, model: str) -> bool:
+        """Whether calls are queued for this provider model, so background work should hold off"""
+        limits = self._limits.get((provider, model))
+        return limits is not None and limits.waiting > 0
+
+    def refund(self, provider: str, model: str, reserved: int, used: Optional[int]):
+        """Return unused token reservation once the real usage is known"""
+        limits = self._limits.get((provider, model))
+        if limits and used is not None and used < reserved:
+            limits.tokens.give(reserved - used, time.monotonic())
+
+    def observe_headers(self, provider: str, model: str, headers):
+        """Adapt buckets to the provider's x-ratelimit-remaining-* headers"""
+        limits = self._limits.get((provider, model))
+        if not limits or headers is None:
+            return
+        now = time.monotonic()
+        try:
+            remaining_requests = headers.get('x-ratelimit-remaining-requests')
+            if remaining_requests is not None:
+                limits.requests.clamp(float(remaining_requests), now)
+            remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+            if remaining_tokens is not None:
+                limits.tokens.clamp(float(remaining_tokens), now)
+        except ValueError:
+            pass
+
+    def note_rate_limited(self, provider: str, model: str, headers) -> float:
+        """Pause a provider model after a 429, returns how long it is blocked"""
+        limits = self._limits.get((provider, model))
+        if not limits:
+            return 0.0
+
+        delay = None
+        if headers is not None:
+            delay = parse_duration(headers.get('retry-after-ms'))
+            delay = delay / 1000 if delay is not None else None
+            if delay is None:
+                delay = parse_duration(headers.get('retry-after'))
+            if delay is None:
+                delay = max(
+                    parse_duration(headers.get('x-ratelimit-reset-requests')) or 0.0,
+                    parse_duration(headers.get('x-ratelimit-reset-tokens')) or 0.0
+                ) or None
+        if delay is None:
+            delay = 1.0  # Provider gave no hint, back off briefly
+
+        now = time.monotonic()
+        limits.blocked_until = max(limits.blocked_until, now + delay)
+        limits.requests.clamp(0, now)
+        return delay
+
+
+# Global admission controller shared by all LLM calls
+admission = AdmissionController()
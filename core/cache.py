@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from core.globals import SENSEI_CACHE_MAX_ENTRIES, SENSEI_CACHE_TTL, VTUBER_CACHE_MAX_ENTRIES
+
+# Filler words that don't change what a question is asking
+STOP_WORDS = frozenset([
+    # Indonesian
+    'apa', 'itu', 'ini', 'yang', 'adalah', 'ialah', 'dan', 'di', 'ke', 'dari', 'tentang', 'mengenai',
+    'tolong', 'jelaskan', 'jelasin', 'terangkan', 'dong', 'sih', 'deh', 'ya', 'yah', 'kah', 'nya',
+    'kak', 'bang', 'min', 'sensei', 'bisa', 'coba', 'aku', 'saya', 'mau', 'tanya', 'pengen',
+    # English
+    'a', 'an', 'the', 'is', 'are', 'what', 'of', 'please', 'explain', 'me', 'about', 'can', 'you', 'tell'
+])
+
+# Words that point back at the conversation ("yang tadi", "contohnya"), so the
+# answer depends on this user's history and not only on the question
+FOLLOW_UP_WORDS = frozenset([
+    # Indonesian
+    'tadi', 'barusan', 'tersebut', 'sebelumnya', 'diatas', 'lanjut', 'lanjutkan', 'lanjutin', 'terusin',
+    'contohnya', 'maksudnya', 'artinya', 'caranya', 'rumusnya', 'jawabannya', 'bedanya', 'kenapanya',
+    # English
+    'it', 'that', 'this', 'those', 'them', 'above', 'previous', 'again', 'more', 'continue'
+])
+
+# A question made only of these (and filler) can't stand alone: "kenapa?", "terus?", "why?"
+BARE_QUESTION_WORDS = frozenset([
+    'kenapa', 'mengapa', 'kok', 'gimana', 'bagaimana', 'terus', 'lalu', 'trus', 'contoh', 'maksud',
+    'lagi', 'oh', 'ok', 'oke', 'hah', 'why', 'how', 'example', 'so', 'then'
+])
+
+# Words and single symbols; symbols like + - * # are part of the question ("2+2", "C++")
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+# Sentence punctuation that doesn't change what is being asked
+IGNORED_PUNCTUATION = frozenset('?!.,;:"\'`()[]{}~')
+
+
+def normalize_question(text: str) -> str:
+    """Case-fold, drop sentence punctuation and filler words so trivially different questions match"""
+    words = [token for token in TOKEN_RE.findall(text.casefold()) if token not in IGNORED_PUNCTUATION]
+    kept = [word for word in words if word not in STOP_WORDS]
+    # A question made only of filler words still needs a stable key
+    return ' '.join(kept or words)
+
+
+def is_follow_up(text: str) -> bool:
+    """Whether a question only makes sense with the conversation before it"""
+    words = [token for token in TOKEN_RE.findall(text.casefold()) if token not in IGNORED_PUNCTUATION]
+    if any(word in FOLLOW_UP_WORDS for word in words):
+        return True
+    return all(word in BARE_QUESTION_WORDS or word in STOP_WORDS for word in words)
+
+
+class ResponseCache:
+    """LRU + TTL cache for LLM answers with single-flight coalescing of concurrent misses"""
+
+    def __init__(self, default_ttl: float = 1800.0, max_entries: int = 256):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(prompt: str, model: str, provider: str) -> str:
+        """Build a cache key from the normalized prompt, model and provider"""
+        normalized = ' '.join(prompt.split()).lower()
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        return f"{provider}:{model}:{digest}"
+
+    def get(self, key: str, record: bool = True) -> Optional[str]:
+        """Get a cached value, or None if missing or expired
+
+        record=False skips the hit/miss counters (for secondary lookups).
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            if record:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if record:
+            self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store a value for ttl seconds, evicting the least recently used entries past the cap"""
+        self._entries[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """Drop expired entries, returns how many were removed"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]],
+                             ttl: Optional[float] = None) -> str:
+        """Return the cached value, or run compute once for all concurrent callers of the same key"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        # Someone is already fetching this key, wait for their answer
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # Mark as retrieved when nobody else was waiting
+            else:
+                future.cancel()
+            raise
+        else:
+            if value:  # Never cache empty answers
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        """Counters for !botstats"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared cache for VTuber research commands
+vtuber_cache = ResponseCache(max_entries=VTUBER_CACHE_MAX_ENTRIES)
+
+# Exact-match answers for !sensei, keyed by the normalized question
+sensei_cache = ResponseCache(default_ttl=SENSEI_CACHE_TTL, max_entries=SENSEI_CACHE_MAX_ENTRIES)
@@ -0,0 +1,76 @@
+import time
+from collections import deque
+
+from core.globals import (
+    BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_ERROR_RATE, BREAKER_TIMEOUT_RATE, BREAKER_COOLDOWN
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker that trips on error rate or timeout rate"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)  # "ok", "error" or "timeout"
+        self.opened_at = 0.0
+        self.probing = False
+
+    def before_call(self):
+        """Fail fast while open; let a single probe through once the cool-off ends"""
+        if self.state == CLOSED:
+            return
+
+        remaining = self.opened_at + BREAKER_COOLDOWN - time.monotonic()
+        if self.state == OPEN and remaining <= 0:
+            self.state = HALF_OPEN
+            self.probing = False
+
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return
+
+        raise CircuitOpenError(self.name, max(0.0, remaining))
+
+    def record(self, outcome: str):
+        """Record a finished call: 'ok', 'error' or 'timeout'"""
+        if self.state == HALF_OPEN:
+            self.probing = False
+            if outcome == "ok":
+                self.state = CLOSED
+                self.outcomes.clear()
+            else:
+                self._trip()
+            return
+
+        self.outcomes.append(outcome)
+        if self.state == CLOSED and len(self.outcomes) >= BREAKER_MIN_CALLS:
+            total = len(self.outcomes)
+            timeouts = self.outcomes.count("timeout")
+            errors = self.outcomes.count("error") + timeouts
+            if errors / total >= BREAKER_ERROR_RATE or timeouts / total >= BREAKER_TIMEOUT_RATE:
+                self._trip()
+
+    def release(self):
+        """A call ended without a verdict (e.g. cancelled by a hedge), free the probe slot"""
+        if self.state == HALF_OPEN:
+            self.probing = False
+
+    def _trip(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        print(f"⚡ Circuit breaker opened for {self.name} ({BREAKER_COOLDOWN:.0f}s)")
@@ -1,13 +1,69 @@
-from datetime import datetime
+import asyncio
 import random
 import re
+import signal
 import openai
 from core.globals import (
     conversation_histories, user_cooldowns, user_moods,
-    COOLDOWN_DURATION, SYSTEM_PROMPT_MIAW, create_mood_prompt, update_mood, cleanup_old_conversations
+    RANDOM_REPLY_CHANCE, SYSTEM_PROMPT_MIAW, create_mood_prompt, update_mood, sweep_idle_sessions,
+    SESSION_SWEEP_INTERVAL, CACHE_PURGE_INTERVAL, RATE_LIMIT_SWEEP_INTERVAL, SHUTDOWN_FLUSH_TIMEOUT
 )
+from core.cache import sensei_cache, vtuber_cache
+from core.semantic import sensei_semantic_index
+from core.ratelimit import evict_idle_all
+from core.scheduler import maintenance
+from core.gamification import gamification
+
+# Message shapes for the random reply
+CAPS_PATTERN = re.compile(r'[A-Z]')
+EMOJI_PATTERN = re.compile(r'[\U0001F600-\U0001F64F]')
+
+
+def random_reply(content: str) -> str:
+    """Miawka's unprompted reply to a chat message"""
+    if len(CAPS_PATTERN.findall(content)) > 7:  # Jika pesan memiliki lebih dari 7 huruf kapital
+        return "Wah, santai aja, gak perlu teriak-teriak."
+    if len(EMOJI_PATTERN.findall(content)) > 3:  # Jika ada lebih dari 3 emoji
+        return "Banyak banget emotnya, koleksi lu?"
+    return "Meow~"
+
+
+def purge_response_caches():
+    """Drop expired answers from the response caches and the semantic index, one per slice"""
+    for index in (sensei_cache, vtuber_cache, sensei_semantic_index):
+        index.purge_expired()
+        yield
+
 
 def setup_event_handlers(bot):
+    # A string prefix can be tested with startswith; anything else goes to discord.py
+    prefix = bot.command_prefix
+    if isinstance(prefix, str):
+        is_prefixed = lambda content: content.startswith(prefix)
+    elif isinstance(prefix, (tuple, list)):
+        prefixes = tuple(prefix)
+        is_prefixed = lambda content: content.startswith(prefixes)
+    else:
+        is_prefixed = lambda content: True
+
+    async def shutdown(sig: signal.Signals):
+        """Save buffered gamification changes, then disconnect so bot.run() returns"""
+        print(f'🛑 Received {sig.name}, saving data before shutting down...')
+        if not await gamification.flush(SHUTDOWN_FLUSH_TIMEOUT):
+            print('⚠️ Gamification data was not fully saved before the shutdown timeout')
+        await bot.close()
+
+    async def setup_hook():
+        # discord.py only handles KeyboardInterrupt; docker stop sends SIGTERM and atexit never runs
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, lambda sig=sig: asyncio.ensure_future(shutdown(sig)))
+            except (NotImplementedError, RuntimeError):
+                pass  # No loop signal handlers on this platform (Windows)
+
+    bot.setup_hook = setup_hook
+
     @bot.event
     async def on_ready():
         print(f'🎉 {bot.user.name} has connected to Discord!')
@@ -15,39 +71,49 @@ def setup_event_handlers(bot):
         print(f'Connected to {len(bot.guilds)} guild(s)')
         print('Bot is ready to receive commands!')
         
-        # Clean up old conversations on startup
-        cleanup_old_conversations()
-        print('🧹 Cleaned up old conversation histories')
+        # Housekeeping runs in the background, spread over time in small slices
+        maintenance.add('idle_sessions', SESSION_SWEEP_INTERVAL, sweep_idle_sessions)
+        maintenance.add('response_caches', CACHE_PURGE_INTERVAL, purge_response_caches)
+        maintenance.add('rate_limits', RATE_LIMIT_SWEEP_INTERVAL, evict_idle_all)
+        # Persist gamification changes in the background instead of on every command
+        gamification.start_write_behind()
+        # Rank every stored profile in a worker thread instead of on the first !leaderboard
+        gamification.start_leaderboards()
+        maintenance.start()
+        print(f'🧹 Started {len(maintenance.jobs)} maintenance jobs')
+
+    # Keep per-server leaderboards in sync with membership (needs the members intent)
+    @bot.event
+    async def on_member_join(member):
+        if not member.bot:
+            gamification.guild_member_joined(str(member.guild.id), str(member.id))
+
+    @bot.event
+    async def on_member_remove(member):
+        gamification.guild_member_left(str(member.guild.id), str(member.id))
+
+    @bot.event
+    async def on_guild_remove(guild):
+        gamification.guild_removed(str(guild.id))
 
     @bot.event
     async def on_message(message):
         if message.author.bot:
             return  # Ignore bot messages
 
-        user_id = message.author.id
-        now = datetime.now()
-
-        # Handling cooldown for responses
-        if user_id in user_cooldowns['miaw']:
-            last_response_time = user_cooldowns['miaw'][user_id]
-            if now - last_response_time < COOLDOWN_DURATION:
-                return  # Ignore if still in cooldown
-        
-        # Update cooldown timer
-        user_cooldowns['miaw'][user_id] = now
-
-        # TODO: Add more complex logic here if needed
+        content = message.content
+        if is_prefixed(content):
+            # Commands always go through; their own cooldowns decide what runs
+            await bot.process_commands(message)
+            return
 
-        if random.random() < 0.01:
-            response = "Meow~";
-            if len(re.findall(r'[A-Z]', message.content)) > 7:  # Jika pesan memiliki lebih dari 5 huruf kapital
-                response = "Wah, santai aja, gak perlu teriak-teriak."
-            elif len(re.findall(r'[\U0001F600-\U0001F64F]', message.content)) > 3:  # Jika ada lebih dari 3 emoji
-                response = "Banyak banget emotnya, koleksi lu?"
+        # Plain chatter: only a mention or the random roll earns a reply
+        mentioned = '<@' in content and bot.user is not None and bot.user.id in message.raw_mentions
+        if not mentioned and random.random() >= RANDOM_REPLY_CHANCE:
+            return
 
-            # Simulate typing before replying
-            async with message.channel.typing():
-                await message.channel.send(response)
+        if user_cooldowns['miaw'].hit(message.author.id):
+            return  # Ignore if still in cooldown
 
-        # Process commands in on_message
-        await bot.process_commands(message)
+        async with message.channel.typing():
+            await message.channel.send(random_reply(content))
@@ -1,34 +1,212 @@
+import asyncio
+import atexit
+import bisect
 import json
+import math
 import os
 import random
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from core.globals import (
+    GAMIFICATION_BACKEND, GAMIFICATION_WRITE_BEHIND, GAMIFICATION_FLUSH_INTERVAL, GAMIFICATION_FLUSH_THRESHOLD
+)
+from core.achievements import AchievementEngine
+from core.leaderboard import GuildLeaderboards, LeaderboardIndex
+from core.profile import PROFILE_KEYS, Profile, achievement_catalog
+from core.scheduler import maintenance
+from core.storage import StoreWriter, create_store
+
+# Profile counter bumped by each track_interaction type
+INTERACTION_COUNTERS = {
+    "miaw": "miaw_interactions",
+    "sensei": "sensei_interactions",
+    "vtuber": "vtuber_commands",
+    "tsundere": "tsundere_reactions",
+    "pat": "pat_count"
+}
+
+# Profile fields an EXP grant changes
+EXP_FIELDS = ("level", "exp", "total_exp", "coins")
+
+# Level curve: going from level N-1 to N costs LEVEL_BASE_EXP + (N - 1) * LEVEL_EXP_STEP
+LEVEL_BASE_EXP = 100
+LEVEL_EXP_STEP = 25
+LEVEL_COIN_BONUS = 10  # Coins per level number reached
+LEVEL_TABLE_SIZE = 1000
+
+def cumulative_exp(level: int) -> int:
+    """Total EXP needed to go from level 1 to level (closed form of the get_exp_for_level series)"""
+    steps = level - 1
+    return LEVEL_BASE_EXP * steps + LEVEL_EXP_STEP * steps * (steps + 1) // 2
+
+# CUMULATIVE_EXP[i] is the EXP needed to reach level i + 1
+CUMULATIVE_EXP = [cumulative_exp(level) for level in range(1, LEVEL_TABLE_SIZE + 1)]
+
+def level_for_exp(progress: int) -> int:
+    """Highest level whose cumulative EXP is within progress"""
+    if progress < CUMULATIVE_EXP[-1]:
+        return max(1, bisect.bisect_right(CUMULATIVE_EXP, progress))
+    # Past the table: solve STEP/2 * s^2 + (BASE + STEP/2) * s <= progress for s = level - 1
+    a, b = LEVEL_EXP_STEP, 2 * LEVEL_BASE_EXP + LEVEL_EXP_STEP
+    steps = (math.isqrt(b * b + 4 * a * 2 * progress) - b) // (2 * a)
+    while cumulative_exp(steps + 2) <= progress:
+        steps += 1
+    while steps > 0 and cumulative_exp(steps + 1) > progress:
+        steps -= 1
+    return steps + 1
+
+# Profile fields an achievement reward changes
+REWARD_STATS = ("achievements", "level", "exp", "total_exp", "coins")
 
 class GamificationSystem:
     def __init__(self):
-        self.data_file = "data/gamification.json"
         self.achievements_file = "data/achievements.json"
-        self.user_data = self.load_user_data()
+        self.store = create_store(GAMIFICATION_BACKEND)
+        self.writer = StoreWriter(self.store)  # All disk writes happen on this thread
+        self.user_data = {}  # Profiles loaded so far, filled lazily from the store
         self.achievements = self.load_achievements()
+        achievement_catalog.register(self.achievements)  # Catalog order = bit order
+        self.achievement_engine = AchievementEngine(self.achievements)
+        self._dirty = set()  # User ids changed since the last flush
+        self.leaderboards = LeaderboardIndex()  # Built in the background by start_leaderboards()
+        self._leaderboard_task = None
+        self.guild_leaderboards = GuildLeaderboards()
     
-    def load_user_data(self):
-        """Load user gamification data"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return {}
-        return {}
+    def save_user_data(self, user_id: Optional[str] = None):
+        """Mark a profile as changed; it is written by the background flusher (write-behind)"""
+        self._dirty.add(user_id)
+        if not GAMIFICATION_WRITE_BEHIND or len(self._dirty) >= GAMIFICATION_FLUSH_THRESHOLD:
+            self._submit_dirty()
+    
+    def _submit_dirty(self):
+        """Snapshot changed profiles and hand them to the writer thread (no disk I/O here)"""
+        if not self._dirty:
+            return
+        
+        dirty = self._dirty
+        self._dirty = set()
+        # None means "something changed, not sure who": write every loaded profile
+        user_ids = self.user_data.keys() if None in dirty else dirty
+        self.writer.submit({uid: self.user_data[uid].to_dict() for uid in user_ids if uid in self.user_data})
+    
+    async def flush(self, timeout: Optional[float] = 30.0) -> bool:
+        """Write every pending change and wait until it is on disk"""
+        self._submit_dirty()
+        return await self.writer.flush(timeout)
     
-    def save_user_data(self):
-        """Save user gamification data"""
+    def close(self):
+        """Final synchronous flush for interpreter shutdown"""
+        self._submit_dirty()
+        self.writer.close()
+    
+    def record_event(self, event: str, user_id: str, *fields: str):
+        """Hand the new values of the changed fields to the store (journal entry) and mark dirty"""
+        self._note_change(event, user_id, fields)
+        self.save_user_data(user_id)
+    
+    def _note_change(self, event: str, user_id: str, fields: Iterable[str]):
+        profile = self.user_data[user_id]
+        self.store.record(event, user_id, profile.snapshot(fields))
+        if self.store.append_only:
+            self.writer.wake()  # Journal lines go out promptly, not only on the flush timer
+        if self.leaderboards.built:
+            self.leaderboards.update(user_id, profile)
+        self.guild_leaderboards.update(user_id, profile)
+    
+    def start_leaderboards(self):
+        """Build the global leaderboard index off the event loop (once)"""
+        if self.leaderboards.built or (self._leaderboard_task and not self._leaderboard_task.done()):
+            return
         try:
-            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.user_data, f, ensure_ascii=False, indent=2)
+            self._leaderboard_task = asyncio.get_running_loop().create_task(self._build_leaderboards())
+        except RuntimeError:
+            pass  # No loop yet; on_ready starts it
+    
+    async def _build_leaderboards(self):
+        started = time.monotonic()
+        index = LeaderboardIndex()
+        try:
+            # Reading the store and the skiplist inserts both run in a worker thread (iter_profiles
+            # may copy every profile), the gateway keeps going
+            await asyncio.get_running_loop().run_in_executor(None, lambda: index.build(self.store.iter_profiles()))
         except Exception as e:
-            print(f"Error saving user data: {e}")
+            print(f"⚠️ Leaderboard build failed: {type(e).__name__}: {e}")
+            return
+        # Profiles changed while we scanned are all loaded; their in-memory values win
+        for user_id, profile in self.user_data.items():
+            index.update(user_id, profile)
+        self.leaderboards = index
+        print(f"🏆 Leaderboards ready: {len(index):,} profiles in {time.monotonic() - started:.1f}s")
+    
+    def find_profile(self, user_id: str) -> Optional[Profile]:
+        """Get a profile without creating one for users who never interacted"""
+        profile = self.user_data.get(user_id)
+        if profile is None:
+            stored = self.store.load(user_id)
+            if stored is None:
+                return None
+            profile = self.user_data[user_id] = Profile.from_dict(stored)
+        return profile
+    
+    def _leaderboard_index(self, guild_id: Optional[str] = None, member_ids: Optional[Iterable[str]] = None):
+        if not self.leaderboards.built:
+            self.start_leaderboards()
+            return None  # Still warming up
+        if guild_id is None:
+            return self.leaderboards
+        return self.guild_leaderboards.view(guild_id, member_ids or (), self.leaderboards)
+    
+    def guild_member_joined(self, guild_id: str, user_id: str):
+        self.guild_leaderboards.add_member(guild_id, user_id, self.leaderboards)
+    
+    def guild_member_left(self, guild_id: str, user_id: str):
+        self.guild_leaderboards.remove_member(guild_id, user_id)
+    
+    def guild_removed(self, guild_id: str):
+        self.guild_leaderboards.drop(guild_id)
+    
+    def leaderboard_page(self, field: str, page: int = 1, per_page: int = 10,
+                         guild_id: Optional[str] = None, member_ids: Optional[Iterable[str]] = None) -> Dict:
+        """One page of a leaderboard, global or scoped to a guild's members
+
+        While the global index is still building, global pages of indexed fields are
+        read straight from storage and the rest come back with "warming": True.
+        """
+        index = self._leaderboard_index(guild_id, member_ids)
+        offset = (page - 1) * per_page
+        if index is not None:
+            rows, total = index.page(field, offset, per_page), len(index)
+        elif guild_id is None and field in self.store.ranked_fields:
+            rows, total = self.store.top(field, offset, per_page), self.store.count()
+        else:
+            return {"entries": [], "total": 0, "page": page, "pages": 1, "warming": True}
+        entries = [
+            {"rank": offset + i + 1, "user_id": user_id, "score": score, "profile": self.get_user_profile(user_id)}
+            for i, (user_id, score) in enumerate(rows)
+        ]
+        return {"entries": entries, "total": total, "page": page, "pages": max(1, -(-total // per_page))}
+    
+    def leaderboard_rank(self, user_id: str, field: str, guild_id: Optional[str] = None,
+                         member_ids: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """A user's 1-based rank and score in a leaderboard, or None if they have no profile"""
+        index = self._leaderboard_index(guild_id, member_ids)
+        if index is None:
+            if guild_id is not None or field not in self.store.ranked_fields:
+                return {"warming": True}
+            ranked = self.store.rank_of(field, user_id)
+            if ranked is None:
+                return None
+            return {"rank": ranked[0] + 1, "total": self.store.count(), "score": ranked[1]}
+        rank = index.rank(field, user_id)
+        if rank is None:
+            return None
+        return {"rank": rank + 1, "total": len(index), "score": index.boards[field].scores[user_id]}
+    
+    def start_write_behind(self):
+        """Flush dirty profiles on a timer, as a maintenance scheduler job"""
+        maintenance.add("gamification_flush", GAMIFICATION_FLUSH_INTERVAL, self._submit_dirty)
     
     def load_achievements(self):
         """Load achievement definitions"""
@@ -45,77 +223,66 @@ class GamificationSystem:
                 "name": "👋 First Hello",
                 "description": "Chat pertama dengan Miawka",
                 "exp": 10,
-                "icon": "🎉"
+                "icon": "🎉",
+                "rule": {"stat": "miaw_interactions", "op": ">=", "value": 1}
             },
             "chatty": {
                 "name": "💬 Chatty Cat",
                 "description": "Chat 10 kali dengan Miawka",
                 "exp": 50,
-                "icon": "😸"
+                "icon": "😸",
+                "rule": {"stat": "miaw_interactions", "op": ">=", "value": 10}
             },
             "pat_master": {
                 "name": "🐱 Pat Master",
                 "description": "Pat Miawka 15 kali",
                 "exp": 80,
-                "icon": "✋"
+                "icon": "✋",
+                "rule": {"stat": "pat_count", "op": ">=", "value": 15}
             }
         }
     
-    def get_user_profile(self, user_id: str) -> Dict:
+    def get_user_profile(self, user_id: str) -> Profile:
         """Get or create user profile"""
-        if user_id not in self.user_data:
-            self.user_data[user_id] = {
-                "level": 1,
-                "exp": 0,
-                "total_exp": 0,
-                "coins": 0,
-                "miaw_interactions": 0,
-                "sensei_interactions": 0,
-                "vtuber_commands": 0,
-                "tsundere_reactions": 0,
-                "pat_count": 0,
-                "daily_streak": 0,
-                "last_daily": None,
-                "achievements": [],
-                "created_at": datetime.now().isoformat(),
-                "last_interaction": datetime.now().isoformat(),
-                "special_items": []
-            }
-            self.save_user_data()
-        return self.user_data[user_id]
+        profile = self.find_profile(user_id)
+        if profile is None:
+            profile = self.user_data[user_id] = Profile()
+            self.record_event("profile_created", user_id, *PROFILE_KEYS)
+        return profile
+    
+    def _grant_exp(self, profile: Dict, exp: int, coins: Optional[int] = None) -> Dict:
+        """Apply exp to a profile in O(1), returning the level/coin changes
+
+        coins overrides the usual half-of-exp coins (level-up bonuses still apply).
+        """
+        old_level = profile["level"]
+        progress = cumulative_exp(old_level) + profile["exp"] + exp
+        new_level = max(old_level, level_for_exp(progress))  # EXP never takes levels away
+        
+        # Bonus coins per level reached: LEVEL_COIN_BONUS * (old_level+1 + ... + new_level)
+        level_bonus = LEVEL_COIN_BONUS * (new_level * (new_level + 1) - old_level * (old_level + 1)) // 2
+        coins_gained = (exp // 2 if coins is None else coins) + level_bonus  # Get coins as half of exp
+        
+        profile["level"] = new_level
+        profile["exp"] = progress - cumulative_exp(new_level)
+        profile["total_exp"] += exp
+        profile["coins"] += coins_gained
+        return {
+            "old_level": old_level,
+            "new_level": new_level,
+            "level_ups": new_level - old_level,
+            "exp_gained": exp,
+            "total_exp": profile["total_exp"],
+            "coins_gained": coins_gained
+        }
     
     def add_exp(self, user_id: str, exp: int, source: str = "general") -> Dict:
         """Add experience and handle level ups"""
         try:
-            profile = self.get_user_profile(user_id)
-            old_level = profile["level"]
-            
-            profile["exp"] += exp
-            profile["total_exp"] += exp
-            profile["coins"] += exp // 2  # Get coins as half of exp
-            
-            # Level up calculation
-            exp_needed = self.get_exp_for_level(profile["level"] + 1)
-            level_ups = 0
-            
-            while profile["exp"] >= exp_needed:
-                profile["exp"] -= exp_needed
-                profile["level"] += 1
-                level_ups += 1
-                profile["coins"] += profile["level"] * 10  # Bonus coins per level
-                exp_needed = self.get_exp_for_level(profile["level"] + 1)
-            
-            self.save_user_data()
-            
-            return {
-                "old_level": old_level,
-                "new_level": profile["level"],
-                "level_ups": level_ups,
-                "exp_gained": exp,
-                "total_exp": profile["total_exp"],
-                "coins_gained": exp // 2 + (level_ups * profile["level"] * 10),
-                "source": source
-            }
+            result = self._grant_exp_and_award(user_id, exp)
+            self.save_user_data(user_id)
+            result["source"] = source
+            return result
         except Exception as e:
             print(f"Error in add_exp: {e}")
             return {
@@ -125,85 +292,149 @@ class GamificationSystem:
                 "exp_gained": 0,
                 "total_exp": 0,
                 "coins_gained": 0,
+                "achievements": [],
                 "source": source
             }
     
+    def _grant_exp_and_award(self, user_id: str, exp: int) -> Dict:
+        """Grant EXP, unlock achievements reading EXP fields and journal both (no save)
+
+        The result carries the unlocked achievements under "achievements".
+        """
+        profile = self.get_user_profile(user_id)
+        result = self._grant_exp(profile, exp)
+        result["achievements"] = self._award_achievements(profile, EXP_FIELDS, result)
+        self._note_change("exp_added", user_id, EXP_FIELDS)
+        if result["achievements"]:
+            self._note_change("achievement_unlocked", user_id, REWARD_STATS)
+        return result
+    
+    def add_exp_bulk(self, grants: Dict[str, int], source: str = "general") -> Dict[str, Dict]:
+        """Grant EXP to many users at once (event rewards, season end) with a single write"""
+        results = {}
+        for user_id, exp in grants.items():
+            try:
+                result = self._grant_exp_and_award(user_id, exp)
+                result["source"] = source
+                results[user_id] = result
+            except Exception as e:
+                print(f"Error in add_exp_bulk for {user_id}: {e}")
+        
+        self._dirty.update(results)
+        self._submit_dirty()
+        return results
+    
     def get_exp_for_level(self, level: int) -> int:
         """Calculate exp needed for specific level"""
-        return 100 + (level - 1) * 25
+        return LEVEL_BASE_EXP + (level - 1) * LEVEL_EXP_STEP
     
-    def track_interaction(self, user_id: str, interaction_type: str) -> List[Dict]:
-        """Track user interaction and check for achievements"""
+    def _update_streak(self, profile: Profile):
+        today = date.today().toordinal()
+        if profile.last_daily_day != today:
+            if profile.last_daily_day == today - 1:
+                profile.daily_streak += 1
+            else:
+                profile.daily_streak = 1
+            profile.last_daily_day = today
+    
+    def apply_events(self, user_id: str, events: List[Dict]) -> Dict:
+        """Apply everything one command earned in a single pass
+        
+        events are {"interaction": "miaw"} and {"exp": 12, "source": "miaw_chat"} dicts.
+        Returns {"exp": add_exp-style result or None, "achievements": [...]} for notifications.
+        """
         try:
             profile = self.get_user_profile(user_id)
-            new_achievements = []
+            interactions = set()
+            exp = 0
+            sources = []
             
-            # Update interaction counts
-            if interaction_type == "miaw":
-                profile["miaw_interactions"] += 1
-            elif interaction_type == "sensei":
-                profile["sensei_interactions"] += 1
-            elif interaction_type == "vtuber":
-                profile["vtuber_commands"] += 1
-            elif interaction_type == "tsundere":
-                profile["tsundere_reactions"] += 1
-            elif interaction_type == "pat":
-                profile["pat_count"] += 1
+            for event in events:
+                counter = INTERACTION_COUNTERS.get(event.get("interaction"))
+                if counter:
+                    profile[counter] += 1
+                    interactions.add(counter)
+                if event.get("exp"):
+                    exp += event["exp"]
+                    sources.append(event.get("source", "general"))
             
-            # Update daily streak
-            today = datetime.now().date().isoformat()
-            if profile.get("last_daily") != today:
-                yesterday = (datetime.now() - timedelta(days=1)).date().isoformat()
-                if profile.get("last_daily") == yesterday:
-                    profile["daily_streak"] += 1
-                else:
-                    profile["daily_streak"] = 1
-                profile["last_daily"] = today
+            if interactions:
+                self._update_streak(profile)
+                interactions.update(("daily_streak", "last_daily"))
+            profile.last_interaction_ts = int(time.time())
+            interactions.add("last_interaction")
             
-            profile["last_interaction"] = datetime.now().isoformat()
+            # Granting 0 EXP changes nothing, but gives achievement rewards a result to level up in
+            exp_result = self._grant_exp(profile, exp)
+            exp_result["source"] = "+".join(sources) or "achievement"
             
-            # Check achievements
-            new_achievements = self.check_achievements(user_id)
+            # Check achievements that depend on what just changed
+            new_achievements = self._award_achievements(
+                profile, interactions.union(EXP_FIELDS) if exp else interactions, exp_result
+            )
+            if not exp and not exp_result["level_ups"]:
+                exp_result = None
             
-            self.save_user_data()
-            return new_achievements
+            # One journal entry per kind of change, then a single save
+            self._note_change("interaction_tracked", user_id, sorted(interactions))
+            if exp:
+                self._note_change("exp_added", user_id, EXP_FIELDS)
+            if new_achievements:
+                self._note_change("achievement_unlocked", user_id, REWARD_STATS)
+            self.save_user_data(user_id)
+            return {"exp": exp_result, "achievements": new_achievements}
         except Exception as e:
-            print(f"Error in track_interaction: {e}")
-            return []
+            print(f"Error in apply_events: {e}")
+            return {"exp": None, "achievements": []}
     
-    def check_achievements(self, user_id: str) -> List[Dict]:
-        """Check and award new achievements"""
+    def track_interaction(self, user_id: str, interaction_type: str) -> List[Dict]:
+        """Track user interaction and check for achievements"""
+        return self.apply_events(user_id, [{"interaction": interaction_type}])["achievements"]
+    
+    def increment_stat(self, user_id: str, stat: str, amount: int = 1):
+        """Increase a numeric profile counter (e.g. sensei_interactions, vtuber_commands)"""
         try:
             profile = self.get_user_profile(user_id)
-            new_achievements = []
-            
-            for ach_id, achievement in self.achievements.items():
-                if ach_id in profile["achievements"]:
-                    continue  # Already has this achievement
-                
-                earned = False
-                
-                # Check achievement conditions
-                if ach_id == "first_chat" and profile["miaw_interactions"] >= 1:
-                    earned = True
-                elif ach_id == "chatty" and profile["miaw_interactions"] >= 10:
-                    earned = True
-                elif ach_id == "pat_master" and profile["pat_count"] >= 15:
-                    earned = True
+            profile[stat] = profile.get(stat, 0) + amount
+            profile.last_interaction_ts = int(time.time())
+            self.record_event("stat_incremented", user_id, stat, "last_interaction")
+        except Exception as e:
+            print(f"Error in increment_stat: {e}")
+    
+    def _award_achievements(self, profile: Dict, changed: Optional[Iterable[str]] = None,
+                            exp_result: Optional[Dict] = None) -> List[Dict]:
+        """Unlock what the profile now qualifies for; reward EXP levels up like any other
+
+        Level-ups from rewards are folded into exp_result when one is given.
+        """
+        new_achievements = []
+        earned = self.achievement_engine.evaluate(profile, changed)
+        while earned:
+            for ach_id in earned:
+                achievement = self.achievements[ach_id]
+                profile["achievements"].append(ach_id)
+                exp_reward = achievement.get("exp", 0)
+                reward = self._grant_exp(profile, exp_reward, coins=exp_reward)
+                if exp_result is not None:
+                    exp_result["new_level"] = reward["new_level"]
+                    exp_result["level_ups"] = reward["new_level"] - exp_result["old_level"]
+                    exp_result["total_exp"] = reward["total_exp"]
                 
-                if earned:
-                    profile["achievements"].append(ach_id)
-                    exp_reward = achievement.get("exp", 0)
-                    profile["exp"] += exp_reward
-                    profile["total_exp"] += exp_reward
-                    profile["coins"] += exp_reward
-                    
-                    new_achievements.append({
-                        "id": ach_id,
-                        "achievement": achievement,
-                        "exp_reward": exp_reward
-                    })
-            
+                new_achievements.append({
+                    "id": ach_id,
+                    "achievement": achievement,
+                    "exp_reward": exp_reward
+                })
+            # Rewards can unlock achievements that depend on them (e.g. achievement count)
+            earned = self.achievement_engine.evaluate(profile, REWARD_STATS)
+        return new_achievements
+    
+    def check_achievements(self, user_id: str, changed: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Check and award new achievements; changed limits the check to rules reading those stats"""
+        try:
+            new_achievements = self._award_achievements(self.get_user_profile(user_id), changed)
+            if new_achievements:
+                self.record_event("achievement_unlocked", user_id, *REWARD_STATS)
             return new_achievements
         except Exception as e:
             print(f"Error in check_achievements: {e}")
@@ -212,13 +443,30 @@ class GamificationSystem:
 # Global gamification instance
 try:
     gamification = GamificationSystem()
+    atexit.register(gamification.close)  # Never lose buffered changes on shutdown
 except Exception as e:
     print(f"Error initializing gamification: {e}")
     # Create a dummy gamification object to prevent crashes
     class DummyGamification:
         def get_user_profile(self, user_id): return {}
-        def add_exp(self, user_id, exp, source="general"): return {"level_ups": 0, "coins_gained": 0}
+        def add_exp(self, user_id, exp, source="general"): return {"level_ups": 0, "coins_gained": 0, "achievements": []}
+        def add_exp_bulk(self, grants, source="general"): return {}
         def track_interaction(self, user_id, interaction_type): return []
+        def apply_events(self, user_id, events): return {"exp": None, "achievements": []}
+        def check_achievements(self, user_id, changed=None): return []
+        def increment_stat(self, user_id, stat, amount=1): pass
+        def save_user_data(self, user_id=None): pass
+        def record_event(self, event, user_id, *fields): pass
+        async def flush(self, timeout=30.0): return True
+        def close(self): pass
+        def leaderboard_page(self, field, page=1, per_page=10, guild_id=None, member_ids=None):
+            return {"entries": [], "total": 0, "page": page, "pages": 1}
+        def leaderboard_rank(self, user_id, field, guild_id=None, member_ids=None): return None
+        def start_write_behind(self): pass
+        def start_leaderboards(self): pass
+        def guild_member_joined(self, guild_id, user_id): pass
+        def guild_member_left(self, guild_id, user_id): pass
+        def guild_removed(self, guild_id): pass
     
     gamification = DummyGamification()
 
@@ -2,7 +2,8 @@ import os
 import discord
 import random
 from dotenv import load_dotenv
-from datetime import timedelta
+from core.ratelimit import RateLimiter
+from core.session import History, SessionBudget, SessionStore
 
 load_dotenv()
 
@@ -14,30 +15,110 @@ LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai').lower()  # Default to openai
 # Intent configurations for discord.py 2.x (Python 3.11 compatible)
 intents = discord.Intents.default()
 intents.message_content = True  # Required for reading message content
+# Privileged; enable "Server Members Intent" in the developer portal before turning this on.
+# Needed for per-server leaderboards, which otherwise fall back to the global ones.
+intents.members = os.getenv('DISCORD_MEMBERS_INTENT', 'false').lower() == 'true'
 
-# Global Variables (state)
+# Constants
+COOLDOWN_DURATION = 3.0  # Seconds between unprompted chat replies to the same user
+RANDOM_REPLY_CHANCE = 0.01  # Chance Miawka chimes in on an ordinary message
+MAX_CONVERSATION_HISTORY = 10  # Limit conversation history to prevent memory issues
+COMPACTION_KEEP_RECENT = 4  # Newest messages kept verbatim when compacting
+COMPACTION_HEADROOM = 2  # Compact once a history is this close to full, before wrap-around drops turns
+SESSION_MAX_USERS = 5000  # Users with in-memory chat state per context, least recently active evicted first
+SESSION_TTL = 6 * 60 * 60  # Seconds of inactivity before a user's chat state is dropped
+SESSION_MAX_TOKENS = 4_000_000  # Estimated tokens (~4 bytes each) of chat state across all session stores
+MOODS = ["tenang", "kuudere", "cuek", "ceria", "penasaran", "tsundere", "mengantuk", "lapar", "excited", "focus"]
+
+def new_history() -> History:
+    return History(maxlen=MAX_CONVERSATION_HISTORY)
+
+# Global Variables (state), bounded per context by SESSION_MAX_USERS and SESSION_TTL,
+# and together by SESSION_MAX_TOKENS (least recently active users go first)
+session_budget = SessionBudget(SESSION_MAX_TOKENS)
 conversation_histories = {
-    'miaw': {},
-    'sensei': {}
+    context: SessionStore(f'{context}_history', SESSION_MAX_USERS, SESSION_TTL, new_history, session_budget)
+    for context in ('miaw', 'sensei')
 }
 user_moods = {
-    'miaw': {},
-    'sensei': {}
+    context: SessionStore(f'{context}_mood', SESSION_MAX_USERS, SESSION_TTL, budget=session_budget)
+    for context in ('miaw', 'sensei')
 }
+
+# Per-user reply cooldowns (GCRA, one float per active user)
 user_cooldowns = {
-    'miaw': {},
-    'sensei': {}
+    'miaw': RateLimiter('miaw_reply', rate=1, per=COOLDOWN_DURATION),
+    'sensei': RateLimiter('sensei_reply', rate=1, per=COOLDOWN_DURATION)
 }
 
-# Constants
-COOLDOWN_DURATION = timedelta(seconds=3)
-MAX_CONVERSATION_HISTORY = 10  # Limit conversation history to prevent memory issues
-MOODS = ["tenang", "kuudere", "cuek", "ceria", "penasaran", "tsundere", "mengantuk", "lapar", "excited", "focus"]
-
 # Response limits
 MAX_RESPONSE_LENGTH = 2000  # Discord message limit
 MAX_CHUNK_SIZE = 1900  # Safe chunk size for splitting long messages
 
+# Admission control for outbound LLM calls
+ADMISSION_MAX_QUEUE = 50  # Max callers waiting per provider model before we reject outright
+ADMISSION_MAX_WAIT = 10.0  # Seconds a caller may wait for a rate-limit slot
+
+# Hedged requests / failover between providers
+HEDGING_ENABLED = os.getenv('LLM_HEDGING', 'true').lower() == 'true'
+HEDGE_PERCENTILE = 0.95  # Hedge once the primary is slower than its usual p95
+HEDGE_MIN_DELAY = 1.5  # Seconds, never hedge earlier than this
+HEDGE_MAX_FRACTION = 0.6  # Never hedge later than this share of the context's timeout (also the delay until we have samples)
+HEDGE_BUDGET_RATIO = 0.05  # At most this share of recent calls may send a hedged duplicate
+HEDGE_BUDGET_MIN = 3  # Hedges always allowed per window, so a quiet bot can still hedge
+HEDGE_BUDGET_WINDOW = 60.0  # Seconds of calls the hedge budget looks back over
+PROVIDER_FAILURE_THRESHOLD = 3  # Consecutive failures before a provider is marked unhealthy
+PROVIDER_COOLDOWN = 60.0  # Seconds an unhealthy provider is skipped as primary
+
+# Per-model circuit breakers and adaptive timeouts
+BREAKER_WINDOW = 20  # Recent calls considered per model
+BREAKER_MIN_CALLS = 5  # Don't judge a model on fewer calls than this
+BREAKER_ERROR_RATE = 0.5  # Trip when half of recent calls failed
+BREAKER_TIMEOUT_RATE = 0.3  # Trip sooner when calls are timing out
+BREAKER_COOLDOWN = 30.0  # Seconds a tripped breaker stays open before probing
+TIMEOUT_MULTIPLIER = 2.0  # Adaptive timeout = observed p99 latency x this, within config bounds
+
+# Streaming replies (edit the reply while tokens arrive)
+STREAMING_ENABLED = os.getenv('LLM_STREAMING', 'true').lower() == 'true'
+STREAM_EDIT_INTERVAL = 1.5  # Seconds between message edits, keeps us under Discord's edit rate limit
+
+# How long VTuber research answers are reused (seconds), keyed by command name
+VTUBER_CACHE_TTL = {
+    'vtubernews': 30 * 60,
+    'trending': 30 * 60,
+    'gametrends': 60 * 60,
+    'culture': 60 * 60,
+    'collab': 60 * 60
+}
+
+VTUBER_CACHE_MAX_ENTRIES = 100
+
+# Exact-match answer cache for !sensei
+SENSEI_CACHE_TTL = 24 * 60 * 60  # Seconds
+SENSEI_CACHE_MAX_ENTRIES = 500  # Least recently used answers are evicted past this
+
+# Semantic near-duplicate lookup for !sensei (needs numpy)
+SEMANTIC_INDEX_DIM = 2048  # Hashed feature buckets per question vector
+SEMANTIC_INDEX_CAPACITY = 500  # Questions kept in the index (oldest overwritten first)
+SEMANTIC_SIMILARITY_THRESHOLD = 0.8  # Cosine similarity needed to reuse an answer
+
+# Gamification persistence (write-behind)
+GAMIFICATION_BACKEND = os.getenv('GAMIFICATION_BACKEND', 'sqlite').lower()  # sqlite, journal or json
+JOURNAL_COMPACT_EVERY = 10000  # Journal entries before they are folded into a snapshot
+GAMIFICATION_WRITE_BEHIND = os.getenv('GAMIFICATION_WRITE_BEHIND', 'true').lower() == 'true'
+GAMIFICATION_FLUSH_INTERVAL = 10.0  # Seconds between background flushes
+GAMIFICATION_FLUSH_THRESHOLD = 500  # Flush right away once this many profiles are dirty
+SHUTDOWN_FLUSH_TIMEOUT = 8.0  # Seconds to wait for the final save on SIGTERM (docker stop kills after 10)
+
+# Background maintenance (core/scheduler.py)
+MAINTENANCE_JITTER = 0.1  # Job intervals vary by +-10% so jobs don't line up
+MAINTENANCE_SLICE_BUDGET = 0.005  # Seconds one slice may block the event loop before it's reported
+MAINTENANCE_RUN_BUDGET = 0.05  # Seconds of work per tick before a sliced job pauses
+SESSION_SWEEP_INTERVAL = 300.0  # Seconds between idle-session sweeps
+SESSION_SWEEP_BATCH = 200  # Sessions dropped per slice
+CACHE_PURGE_INTERVAL = 600.0  # Seconds between expired-answer purges
+RATE_LIMIT_SWEEP_INTERVAL = 300.0  # Seconds between idle rate-limit key sweeps
+
 # Model configurations
 MODEL_CONFIGS = {
     'perplexity': {
@@ -45,13 +126,21 @@ MODEL_CONFIGS = {
             'model': 'sonar',
             'max_tokens': 800,  # Shorter for chat
             'temperature': 0.8,
-            'timeout': 25.0
+            'history_tokens': 1200,  # Token budget for past turns sent with each prompt
+            'timeout': 25.0,  # Upper bound for the adaptive timeout
+            'min_timeout': 8.0,  # Lower bound for the adaptive timeout
+            'requests_per_minute': 50,
+            'tokens_per_minute': 200000
         },
         'sensei': {
             'model': 'sonar-reasoning',
             'max_tokens': 2000,  # Longer for explanations
             'temperature': 0.6,
-            'timeout': 30.0
+            'history_tokens': 2000,
+            'timeout': 30.0,
+            'min_timeout': 10.0,
+            'requests_per_minute': 50,
+            'tokens_per_minute': 200000
         }
     },
     'openai': {
@@ -59,13 +148,21 @@ MODEL_CONFIGS = {
             'model': 'gpt-4o-mini',
             'max_tokens': 800,
             'temperature': 0.8,
-            'timeout': 20.0
+            'history_tokens': 1200,
+            'timeout': 20.0,
+            'min_timeout': 8.0,
+            'requests_per_minute': 500,
+            'tokens_per_minute': 200000
         },
         'sensei': {
             'model': 'gpt-4',
             'max_tokens': 2000,
             'temperature': 0.6,
-            'timeout': 25.0
+            'history_tokens': 2000,
+            'timeout': 25.0,
+            'min_timeout': 10.0,
+            'requests_per_minute': 500,
+            'tokens_per_minute': 10000
         }
     }
 }
@@ -161,19 +258,18 @@ def create_mood_prompt(mood):
     return f"Saat ini, mood Miawka adalah {mood}. {mood_descriptions.get(mood, '')}"
 
 def reset_user_state(user_id, context):
-    if user_id in conversation_histories[context]:
-        del conversation_histories[context][user_id]
-    if user_id in user_moods[context]:
-        del user_moods[context][user_id]
-    if user_id in user_cooldowns[context]:
-        del user_cooldowns[context][user_id]
-
-def get_llm_config():
+    conversation_histories[context].pop(user_id)
+    user_moods[context].pop(user_id)
+    user_cooldowns[context].reset(user_id)
+
+def get_llm_config(provider=None):
     """Get LLM configuration with model-specific settings"""
-    config = MODEL_CONFIGS.get(LLM_PROVIDER, MODEL_CONFIGS['openai'])
+    provider = provider or LLM_PROVIDER
+    config = MODEL_CONFIGS.get(provider, MODEL_CONFIGS['openai'])
     
-    if LLM_PROVIDER == 'perplexity':
+    if provider == 'perplexity':
         return {
+            'provider': 'perplexity',
             'api_key': PERPLEXITY_API_KEY,
             'base_url': 'https://api.perplexity.ai',
             'models': {key: settings['model'] for key, settings in config.items()},
@@ -181,6 +277,7 @@ def get_llm_config():
         }
     else:  # openai
         return {
+            'provider': 'openai',
             'api_key': OPENAI_API_KEY,
             'base_url': None,
             'models': {key: settings['model'] for key, settings in config.items()},
@@ -188,13 +285,23 @@ def get_llm_config():
         }
 
 def cleanup_old_conversations():
-    """Clean up old conversation histories to prevent memory issues"""
-    for context in conversation_histories:
-        for user_id in list(conversation_histories[context].keys()):
-            history = conversation_histories[context][user_id]
-            if len(history) > MAX_CONVERSATION_HISTORY:
-                # Keep only the last MAX_CONVERSATION_HISTORY messages
-                conversation_histories[context][user_id] = history[-MAX_CONVERSATION_HISTORY:]
+    """Drop chat state of users idle past SESSION_TTL; returns how many sessions were removed
+
+    Histories are ring buffers of MAX_CONVERSATION_HISTORY turns, so they never need trimming.
+    """
+    removed = 0
+    for stores in (conversation_histories, user_moods):
+        for store in stores.values():
+            removed += store.purge_expired()
+    return removed
+
+def sweep_idle_sessions():
+    """cleanup_old_conversations in slices of SESSION_SWEEP_BATCH, for the maintenance scheduler"""
+    for stores in (conversation_histories, user_moods):
+        for store in stores.values():
+            while store.purge_expired(SESSION_SWEEP_BATCH) == SESSION_SWEEP_BATCH:
+                yield
+            yield
 
 def get_user_stats(user_id):
     """Get user interaction statistics"""
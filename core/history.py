@@ -0,0 +1,75 @@
+import re
+from typing import Dict, Iterable, List
+
+# Word pieces of up to 4 characters plus single symbols/emoji, a close offline
+# approximation of how BPE tokenizers split mixed Indonesian/English chat
+TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Fixed per-message overhead the chat format adds (role markers, separators)
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PREFIX = "Ringkasan percakapan sebelumnya dengan user ini:"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a piece of text costs, without any external tokenizer"""
+    return len(TOKEN_RE.findall(text or ""))
+
+
+def message_tokens(message: Dict) -> int:
+    """Token cost of a history message, computed once and cached on the message"""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+        message["tokens"] = tokens
+    return tokens
+
+
+def pack_history(history: Iterable[Dict], budget: int, skip_latest: int = 0) -> List[Dict]:
+    """Pick the most recent turns that fit in the token budget, oldest first
+
+    skip_latest leaves out the newest messages (e.g. the user message that is
+    about to be sent separately).
+    """
+    packed = []
+    used = 0
+    for index, message in enumerate(reversed(history)):
+        if index < skip_latest or message.get("summary"):
+            continue
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        used += cost
+        # Only role/content go to the API, the cached token count stays local
+        packed.append({"role": message["role"], "content": message["content"]})
+
+    packed.reverse()
+    return alternate_roles(packed)
+
+
+def summary_messages(history: Iterable[Dict]) -> List[Dict]:
+    """System message carrying the compacted memory of older turns, if there is one"""
+    for message in history:
+        if message.get("summary"):
+            return [{"role": "system", "content": f"{SUMMARY_PREFIX} {message['content']}"}]
+        break  # The summary always sits at the start of the history
+    return []
+
+
+def alternate_roles(messages: List[Dict]) -> List[Dict]:
+    """Make turns strictly alternate user/assistant, starting with user and ending with assistant
+
+    Some providers (Perplexity) reject anything else. Failed calls leave
+    back-to-back user messages behind, so the latest one of a run is kept.
+    """
+    alternated = []
+    for message in messages:
+        if alternated and alternated[-1]["role"] == message["role"]:
+            alternated[-1] = message
+        elif alternated or message["role"] == "user":
+            alternated.append(message)
+
+    # The caller appends the current user message right after the history
+    if alternated and alternated[-1]["role"] == "user":
+        alternated.pop()
+    return alternated
@@ -0,0 +1,91 @@
+import re
+from typing import Dict, FrozenSet, List, NamedTuple
+
+# Keyword tables per category; multi-word phrases match across any whitespace
+KEYWORD_TABLES: Dict[str, List[str]] = {
+    # !miaw interactions
+    'greeting': ['hi', 'hai', 'hello', 'halo', 'hey'],
+    'farewell': ['bye', 'goodbye', 'dadah', 'see you', 'sampai jumpa'],
+    'compliment': ['cute', 'lucu', 'cantik', 'imut', 'kawaii'],
+    'love': ['love', 'sayang', 'cinta', 'suka'],
+    'pat': ['pat', 'elus', 'usap'],
+    'food': ['makan', 'food', 'lapar', 'hungry'],
+    'game': ['game', 'main', 'play', 'gaming'],
+    'sing': ['sing', 'nyanyi', 'lagu', 'song'],
+    'tsundere': ['tsundere', 'baka', 'stupid', 'dummy'],
+    # Sentiment, picks Miawka's reaction emoji
+    'sad': ['sad', 'sedih', 'down', 'bete', 'galau'],
+    'happy': ['happy', 'senang', 'excited', 'hype'],
+    'confused': ['confused', 'bingung', 'ga ngerti'],
+    'tired': ['tired', 'capek', 'sleepy', 'ngantuk'],
+    # !sensei learning intent
+    'educational': ['why', 'how', 'what', 'explain', 'teach', 'learn', 'study', 'understand', 'help']
+}
+
+# Indonesian possessive/definite suffixes still count as the word ("sayangku", "makannya")
+WORD_SUFFIXES = ('nya', 'ku', 'mu')
+
+SENSEI_KEYWORD_BONUS = 2
+SENSEI_QUESTION_BONUS = 3
+
+
+def _trie_pattern(phrases) -> str:
+    """Regex for a set of phrases, factored into a character trie
+
+    Shared prefixes are matched once, so the engine never retries every
+    keyword at every position; a space in a phrase matches any whitespace.
+    """
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End of a phrase
+
+    def build(node: Dict[str, dict]) -> str:
+        is_end = '' in node
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        return f"(?:{'|'.join(branches)}){'?' if is_end else ''}"
+
+    return build(trie)
+
+
+def _build_matcher(tables: Dict[str, List[str]]):
+    phrase_categories: Dict[str, set] = {}
+    for category, phrases in tables.items():
+        for phrase in phrases:
+            key = ' '.join(phrase.casefold().split())
+            phrase_categories.setdefault(key, set()).add(category)
+
+    suffixes = '|'.join(WORD_SUFFIXES)
+    pattern = re.compile(rf'(?<!\w)({_trie_pattern(phrase_categories)})(?:{suffixes})?(?!\w)', re.IGNORECASE)
+    lookup = {phrase: frozenset(categories) for phrase, categories in phrase_categories.items()}
+    return pattern, lookup
+
+
+KEYWORD_PATTERN, PHRASE_CATEGORIES = _build_matcher(KEYWORD_TABLES)
+
+
+class MessageFeatures(NamedTuple):
+    categories: FrozenSet[str]  # Keyword categories found, plus 'question' for '?'
+    sensei_bonus: int  # Extra !sensei EXP for learning intent and questions
+
+
+def analyze_message(text: str) -> MessageFeatures:
+    """Find every keyword category in one regex pass over the message"""
+    categories = set()
+    for match in KEYWORD_PATTERN.finditer(text):
+        categories |= PHRASE_CATEGORIES[' '.join(match.group(1).casefold().split())]
+
+    bonus = SENSEI_KEYWORD_BONUS if 'educational' in categories else 0
+    if '?' in text:
+        categories.add('question')
+        bonus += SENSEI_QUESTION_BONUS
+    return MessageFeatures(frozenset(categories), bonus)
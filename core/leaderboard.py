@@ -0,0 +1,256 @@
+import random
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Profile fields that have a ranked index (achievements rank by count)
+LEADERBOARD_FIELDS = ("level", "total_exp", "coins", "miaw_interactions", "achievements")
+
+MAX_LEVEL = 24  # Enough for ~16M entries at p = 1/2
+
+
+def profile_score(profile: Dict, field: str) -> int:
+    """Numeric score of a profile in a leaderboard category"""
+    value = profile.get(field, 0)
+    if isinstance(value, int):
+        return value
+    return len(value) if value else 0  # Achievement lists/sets rank by count
+
+
+class _Node:
+    __slots__ = ("key", "forward", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.width = [1] * level  # Level-0 steps to the next node on each level
+
+
+class SkipList:
+    """Indexable skiplist: O(log n) insert, remove, rank-of-key and seek-to-offset
+
+    Every link stores how many entries it jumps over, so positions can be
+    counted on the way down instead of walking the bottom level.
+    """
+
+    def __init__(self):
+        self.head = _Node(None, MAX_LEVEL)
+        self.level = 1
+        self.size = 0
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _find_update(self, key) -> Tuple[List[_Node], List[int]]:
+        """Last node before key on every level, and its position (head is 0)"""
+        update = [self.head] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node = self.head
+        position = 0
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                position += node.width[i]
+                node = node.forward[i]
+            update[i] = node
+            positions[i] = position
+        return update, positions
+
+    def insert(self, key):
+        update, positions = self._find_update(key)
+        position = positions[0] + 1  # Where the new node lands
+        level = self._random_level()
+        self.level = max(self.level, level)
+
+        node = _Node(key, level)
+        for i in range(level):
+            prev = update[i]
+            node.forward[i] = prev.forward[i]
+            prev.forward[i] = node
+            node.width[i] = prev.width[i] - (position - 1 - positions[i])
+            prev.width[i] = position - positions[i]
+        for i in range(level, MAX_LEVEL):
+            update[i].width[i] += 1  # Links jumping over the new node get one longer
+        self.size += 1
+
+    def remove(self, key) -> bool:
+        update, _ = self._find_update(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(MAX_LEVEL):
+            prev = update[i]
+            if i < len(node.forward) and prev.forward[i] is node:
+                prev.width[i] += node.width[i] - 1
+                prev.forward[i] = node.forward[i]
+            else:
+                prev.width[i] -= 1
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.size -= 1
+        return True
+
+    def rank(self, key) -> Optional[int]:
+        """0-based position of key, or None if it isn't stored"""
+        update, positions = self._find_update(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return None
+        return positions[0]
+
+    def iter_from(self, offset: int):
+        """Iterate keys starting at a 0-based offset"""
+        if offset >= self.size:
+            return
+        target = offset + 1
+        node = self.head
+        position = 0
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.forward[i]
+        while node is not None:
+            yield node.key
+            node = node.forward[0]
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def __len__(self):
+        return self.size
+
+
+class Leaderboard:
+    """Ranking of users in one category, highest score first"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.scores: Dict[str, int] = {}
+        self.ranking = SkipList()  # Keys are (-score, user_id)
+
+    def update(self, user_id: str, score: int):
+        old = self.scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self.ranking.remove((-old, user_id))
+        self.ranking.insert((-score, user_id))
+        self.scores[user_id] = score
+
+    def remove(self, user_id: str):
+        score = self.scores.pop(user_id, None)
+        if score is not None:
+            self.ranking.remove((-score, user_id))
+
+    def page(self, offset: int, limit: int) -> List[Tuple[str, int]]:
+        """(user_id, score) pairs at ranks offset .. offset + limit - 1"""
+        return [(user_id, -neg_score) for neg_score, user_id in islice(self.ranking.iter_from(offset), limit)]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """0-based rank of a user, or None if they aren't ranked"""
+        score = self.scores.get(user_id)
+        return None if score is None else self.ranking.rank((-score, user_id))
+
+    def __len__(self):
+        return len(self.ranking)
+
+
+class LeaderboardIndex:
+    """One Leaderboard per category, kept current as profiles change"""
+
+    def __init__(self, fields: Iterable[str] = LEADERBOARD_FIELDS):
+        self.boards = {field: Leaderboard(field) for field in fields}
+        self.built = False
+
+    def build(self, profiles: Iterable[Tuple[str, Dict]]):
+        """Fill every board from a full pass over the stored profiles (done once)"""
+        for user_id, profile in profiles:
+            self.update(user_id, profile)
+        self.built = True
+
+    def update(self, user_id: str, profile: Dict):
+        """Re-rank a user whose profile changed, O(log n) per category"""
+        for field, board in self.boards.items():
+            board.update(user_id, profile_score(profile, field))
+
+    def scores_of(self, user_id: str) -> Optional[Dict[str, int]]:
+        """A user's score in every category, or None if they aren't ranked"""
+        if user_id not in next(iter(self.boards.values())).scores:
+            return None
+        return {field: board.scores[user_id] for field, board in self.boards.items()}
+
+    def set_scores(self, user_id: str, scores: Dict[str, int]):
+        for field, board in self.boards.items():
+            board.update(user_id, scores[field])
+
+    def remove(self, user_id: str):
+        for board in self.boards.values():
+            board.remove(user_id)
+
+    def page(self, field: str, offset: int, limit: int) -> List[Tuple[str, int]]:
+        return self.boards[field].page(offset, limit)
+
+    def rank(self, field: str, user_id: str) -> Optional[int]:
+        return self.boards[field].rank(user_id)
+
+    def __len__(self):
+        return len(next(iter(self.boards.values())))
+
+
+class GuildLeaderboards:
+    """Per-guild views of the leaderboards, so a server only competes with itself
+
+    A view is filled once from the guild's member list, copying scores from the
+    global index (no storage reads), then kept current by member join/leave
+    events and profile updates.
+    """
+
+    def __init__(self):
+        self.views: Dict[str, LeaderboardIndex] = {}
+        self.member_guilds: Dict[str, Set[str]] = {}  # user_id -> guild ids with a built view
+
+    def view(self, guild_id: str, member_ids: Iterable[str], source: LeaderboardIndex) -> LeaderboardIndex:
+        """The guild's index, built from member_ids on first use"""
+        index = self.views.get(guild_id)
+        if index is None:
+            index = self.views[guild_id] = LeaderboardIndex()
+            for user_id in member_ids:
+                self.add_member(guild_id, user_id, source)
+            index.built = True
+        return index
+
+    def add_member(self, guild_id: str, user_id: str, source: LeaderboardIndex):
+        index = self.views.get(guild_id)
+        if index is None:
+            return  # Built with the current member list on first use
+        self.member_guilds.setdefault(user_id, set()).add(guild_id)
+        scores = source.scores_of(user_id)
+        if scores is not None:
+            index.set_scores(user_id, scores)
+
+    def remove_member(self, guild_id: str, user_id: str):
+        index = self.views.get(guild_id)
+        if index is None:
+            return
+        index.remove(user_id)
+        guilds = self.member_guilds.get(user_id)
+        if guilds is not None:
+            guilds.discard(guild_id)
+            if not guilds:
+                del self.member_guilds[user_id]
+
+    def drop(self, guild_id: str):
+        if self.views.pop(guild_id, None) is None:
+            return
+        for user_id in [uid for uid, guilds in self.member_guilds.items() if guild_id in guilds]:
+            guilds = self.member_guilds[user_id]
+            guilds.discard(guild_id)
+            if not guilds:
+                del self.member_guilds[user_id]
+
+    def update(self, user_id: str, profile: Dict):
+        """Re-rank a user in every guild view they belong to"""
+        for guild_id in self.member_guilds.get(user_id, ()):
+            self.views[guild_id].update(user_id, profile)
@@ -0,0 +1,493 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+import openai
+import core.globals as globals_module
+from core.globals import (
+    get_llm_config, HEDGING_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_DELAY, HEDGE_MAX_FRACTION,
+    HEDGE_BUDGET_RATIO, HEDGE_BUDGET_MIN, HEDGE_BUDGET_WINDOW,
+    PROVIDER_FAILURE_THRESHOLD, PROVIDER_COOLDOWN, TIMEOUT_MULTIPLIER
+)
+from core.admission import admission, AdmissionRejected
+from core.circuit import CircuitBreaker, CircuitOpenError
+
+# How long a retired client is kept open so in-flight requests can finish
+CLIENT_RETIRE_GRACE = 60.0
+
+
+def estimate_request_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """Rough upper bound of the tokens a request can consume (prompt + completion)"""
+    prompt_chars = sum(len(message.get('content') or '') for message in messages)
+    return prompt_chars // 4 + max_tokens
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies for one provider/context"""
+
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get the p-th percentile (0..1), or None with too few samples to trust"""
+        if len(self.samples) < 10:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class HedgeBudget:
+    """Caps hedged duplicates to a share of the calls made in a sliding window
+
+    Like a retry budget: a slow provider can't turn every call into two.
+    """
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, minimum: int = HEDGE_BUDGET_MIN,
+                 window: float = HEDGE_BUDGET_WINDOW):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self.calls = deque()  # Timestamps of hedgeable calls
+        self.hedges = deque()  # Timestamps of hedges sent
+        self.denied = 0
+
+    def _trim(self, now: float):
+        for stamps in (self.calls, self.hedges):
+            while stamps and stamps[0] <= now - self.window:
+                stamps.popleft()
+
+    def record_call(self):
+        self.calls.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget, False if the window already used its share"""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self.hedges) >= max(self.minimum, self.ratio * len(self.calls)):
+            self.denied += 1
+            return False
+        self.hedges.append(now)
+        return True
+
+
+class ProviderHealth:
+    """Consecutive-failure tracking with a cool-off window"""
+
+    def __init__(self):
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, provider: str):
+        self.failures += 1
+        if self.failures >= PROVIDER_FAILURE_THRESHOLD and self.healthy:
+            self.unhealthy_until = time.monotonic() + PROVIDER_COOLDOWN
+            print(f"⚠️ LLM provider {provider} marked unhealthy for {PROVIDER_COOLDOWN:.0f}s")
+
+
+class LLMGateway:
+    """Shared async entry point for every LLM call made by the bot"""
+
+    def __init__(self):
+        # provider -> (api_key, base_url, client)
+        self._clients: Dict[str, tuple] = {}
+        self._latency: Dict[tuple, LatencyTracker] = {}
+        self._health: Dict[str, ProviderHealth] = {}
+        self._breakers: Dict[tuple, CircuitBreaker] = {}
+        self.hedge_budget = HedgeBudget()
+
+    def get_client(self, provider: Optional[str] = None):
+        """Get the long-lived AsyncOpenAI client for a provider, creating it on first use"""
+        config = get_llm_config(provider)
+        provider = config['provider']
+        base_url = config['base_url'] if config['base_url'] else "https://api.openai.com/v1"
+
+        cached = self._clients.get(provider)
+        if cached and cached[0] == config['api_key'] and cached[1] == base_url:
+            return cached[2]
+
+        if cached:
+            # API key or endpoint changed, retire the stale client
+            self._retire(cached[2])
+
+        # The client keeps its own keep-alive connection pool, so reusing it
+        # skips the TLS handshake on every request. Retries are left to the
+        # admission controller so 429s don't turn into retry storms.
+        client = openai.AsyncOpenAI(
+            api_key=config['api_key'],
+            base_url=base_url,
+            max_retries=0
+        )
+        self._clients[provider] = (config['api_key'], base_url, client)
+        return client
+
+    async def _create(self, config: Dict, context: str, messages: List[Dict], reserved: int, **kwargs):
+        """Issue a completion request through admission control, retrying once after a 429"""
+        provider = config['provider']
+        model = config['models'][context]
+        settings = config['settings'][context]
+        client = self.get_client(provider)
+
+        for attempt in range(2):
+            await admission.acquire(provider, model, settings, reserved)
+            try:
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=messages,
+                    **kwargs
+                )
+            except openai.RateLimitError as e:
+                delay = admission.note_rate_limited(provider, model, e.response.headers)
+                print(f"LLM rate limited on {provider}/{model}, backing off {delay:.1f}s")
+                if attempt:
+                    raise
+                continue  # The next acquire waits out Retry-After within its deadline
+            except openai.APITimeoutError as e:
+                # Call sites already handle asyncio timeouts with a friendly message
+                raise asyncio.TimeoutError() from e
+
+            admission.observe_headers(provider, model, raw.headers)
+            return raw.parse()
+
+    def _get_latency(self, provider: str, context: str, kind: str) -> LatencyTracker:
+        key = (provider, context, kind)
+        if key not in self._latency:
+            self._latency[key] = LatencyTracker()
+        return self._latency[key]
+
+    def _get_health(self, provider: str) -> ProviderHealth:
+        if provider not in self._health:
+            self._health[provider] = ProviderHealth()
+        return self._health[provider]
+
+    def _record_outcome(self, provider: str, error: Optional[BaseException]):
+        """Feed a call result into provider health (rejections and cancels don't count)"""
+        if error is None:
+            self._get_health(provider).record_success()
+        elif isinstance(error, Exception) and not isinstance(error, (AdmissionRejected, CircuitOpenError)):
+            self._get_health(provider).record_failure(provider)
+
+    def get_breaker(self, provider: str, model: str) -> CircuitBreaker:
+        """Get the circuit breaker guarding one provider model"""
+        key = (provider, model)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(f"{provider}/{model}")
+        return self._breakers[key]
+
+    def _adaptive_timeout(self, provider: str, context: str, kind: str, settings: Dict) -> float:
+        """Timeout from observed p99 latency, bounded by the model's min_timeout and timeout"""
+        upper = settings['timeout']
+        lower = min(settings.get('min_timeout', upper), upper)
+        observed = self._get_latency(provider, context, kind).percentile(0.99)
+        if observed is None:
+            return upper
+        return min(upper, max(lower, observed * TIMEOUT_MULTIPLIER))
+
+    def _resolve_settings(self, provider: str, context: str, kind: str, max_tokens: Optional[int],
+                          temperature: Optional[float], timeout: Optional[float]) -> tuple:
+        """Fill unset request options from MODEL_CONFIGS"""
+        config = get_llm_config(provider)
+        settings = config['settings'][context]
+        return (
+            config,
+            max_tokens if max_tokens is not None else settings['max_tokens'],
+            temperature if temperature is not None else settings['temperature'],
+            timeout if timeout is not None else self._adaptive_timeout(provider, context, kind, settings)
+        )
+
+    def _record_latency(self, provider: str, context: str, kind: str, started: float,
+                        error: Optional[BaseException] = None, timeout: float = 0.0):
+        """Add a latency sample; a timed-out call counts as at least its timeout
+
+        Keeping only successes would feed the adaptive timeout the calls that
+        beat it, so it could never grow back after cutting too tight.
+        """
+        elapsed = time.monotonic() - started
+        if error is None:
+            self._get_latency(provider, context, kind).record(elapsed)
+        elif isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+            self._get_latency(provider, context, kind).record(max(elapsed, timeout))
+
+    def _record_breaker(self, breaker: CircuitBreaker, error: Optional[BaseException]):
+        if error is None:
+            breaker.record("ok")
+        elif isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+            breaker.record("timeout")
+        elif isinstance(error, (AdmissionRejected, CircuitOpenError)) or not isinstance(error, Exception):
+            breaker.release()  # Not the model's fault (or cancelled by a hedge)
+        else:
+            breaker.record("error")
+
+    def _pick_providers(self) -> tuple:
+        """Get (primary, secondary) providers, skipping an unhealthy primary"""
+        primary = globals_module.LLM_PROVIDER
+        if not HEDGING_ENABLED:
+            return primary, None
+
+        secondary = next((name for name in globals_module.MODEL_CONFIGS if name != primary), None)
+        if secondary and not get_llm_config(secondary)['api_key']:
+            secondary = None  # No credentials for the backup provider
+
+        if secondary and not self._get_health(primary).healthy and self._get_health(secondary).healthy:
+            return secondary, primary
+        return primary, secondary
+
+    def primary_provider(self) -> str:
+        """Provider an unhedged call would go to right now"""
+        return self._pick_providers()[0]
+
+    def _hedge_delay(self, provider: str, context: str, kind: str) -> float:
+        """How long to wait on the primary before sending a duplicate to the secondary
+
+        Capped at a share of the context's timeout, so slow-by-design contexts
+        (sensei reasoning) don't hedge nearly every call.
+        """
+        cap = get_llm_config(provider)['settings'][context]['timeout'] * HEDGE_MAX_FRACTION
+        observed = self._get_latency(provider, context, kind).percentile(HEDGE_PERCENTILE)
+        if observed is None:
+            return cap
+        return min(cap, max(HEDGE_MIN_DELAY, observed))
+
+    async def chat(self, context: str, messages: List[Dict], max_tokens: Optional[int] = None,
+                   temperature: Optional[float] = None, timeout: Optional[float] = None,
+                   provider: Optional[str] = None, served: Optional[Dict] = None) -> str:
+        """Run a chat completion for a context ('miaw' or 'sensei') and return the raw text
+
+        Unset options come from MODEL_CONFIGS for whichever provider serves the call.
+        served, if given, gets the 'provider' and 'model' that actually answered.
+        """
+        kwargs = dict(max_tokens=max_tokens, temperature=temperature, timeout=timeout)
+        primary, secondary = (provider, None) if provider else self._pick_providers()
+        if not secondary:
+            answer = await self._chat_once(primary, context, messages, **kwargs)
+            self._note_served(served, primary, context)
+            return answer
+
+        self.hedge_budget.record_call()
+        tasks = {asyncio.ensure_future(self._chat_once(primary, context, messages, **kwargs)): primary}
+        try:
+            primary_task = next(iter(tasks))
+            await asyncio.wait(tasks, timeout=self._hedge_delay(primary, context, 'chat'))
+            if not primary_task.done() and not self.hedge_budget.try_spend():
+                await asyncio.wait(tasks)  # Out of hedges: stay on the primary, failing over only on error
+            if primary_task.done() and not primary_task.exception():
+                self._note_served(served, primary, context)
+                return primary_task.result()
+
+            # Primary is slow (hedge) or already failed (failover): race the secondary
+            tasks[asyncio.ensure_future(self._chat_once(secondary, context, messages, **kwargs))] = secondary
+            first_error = primary_task.exception() if primary_task.done() else None
+            pending = set(task for task in tasks if not task.done())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception():
+                        self._note_served(served, tasks[task], context)
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            # The loser is cancelled as soon as there is a winner
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _note_served(served: Optional[Dict], provider: str, context: str):
+        if served is not None:
+            served['provider'] = provider
+            served['model'] = get_llm_config(provider)['models'][context]
+
+    async def _chat_once(self, provider: str, context: str, messages: List[Dict], max_tokens: Optional[int],
+                         temperature: Optional[float], timeout: Optional[float]) -> str:
+        """Run a chat completion against one provider, tracking its latency and health"""
+        config, max_tokens, temperature, timeout = self._resolve_settings(
+            provider, context, 'chat', max_tokens, temperature, timeout
+        )
+        breaker = self.get_breaker(provider, config['models'][context])
+        breaker.before_call()  # Fails fast while the model is known to be down
+        started = time.monotonic()
+        reserved = estimate_request_tokens(messages, max_tokens)
+
+        try:
+            response = await self._create(
+                config, context, messages, reserved,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout
+            )
+        except BaseException as e:
+            self._record_outcome(provider, e)
+            self._record_breaker(breaker, e)
+            self._record_latency(provider, context, 'chat', started, e, timeout)
+            raise
+
+        self._record_outcome(provider, None)
+        self._record_breaker(breaker, None)
+        self._record_latency(provider, context, 'chat', started)
+
+        usage = getattr(response, 'usage', None)
+        admission.refund(provider, config['models'][context], reserved,
+                         usage.total_tokens if usage else None)
+        return response.choices[0].message.content or ""
+
+    async def stream_chat(self, context: str, messages: List[Dict], max_tokens: Optional[int] = None,
+                          temperature: Optional[float] = None, timeout: Optional[float] = None,
+                          provider: Optional[str] = None, served: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding text deltas as they arrive
+
+        served, if given, gets the 'provider' and 'model' that actually answered.
+        """
+        kwargs = dict(max_tokens=max_tokens, temperature=temperature, timeout=timeout)
+        primary, secondary = (provider, None) if provider else self._pick_providers()
+        if not secondary:
+            self._note_served(served, primary, context)
+            async for delta in self._stream_once(primary, context, messages, **kwargs):
+                yield delta
+            return
+
+        # Hedge on time-to-first-token: whichever provider starts talking first wins
+        self.hedge_budget.record_call()
+        streams = {}
+        providers = {}
+        try:
+            stream = self._stream_once(primary, context, messages, **kwargs)
+            streams[asyncio.ensure_future(stream.__anext__())] = stream
+            providers[stream] = primary
+            done, _ = await asyncio.wait(streams, timeout=self._hedge_delay(primary, context, 'stream'))
+            if not done and not self.hedge_budget.try_spend():
+                done, _ = await asyncio.wait(streams)  # Out of hedges: stay on the primary, failing over only on error
+
+            first = next(iter(done), None)
+            if first is None or not isinstance(first.exception(), (type(None), StopAsyncIteration)):
+                stream = self._stream_once(secondary, context, messages, **kwargs)
+                streams[asyncio.ensure_future(stream.__anext__())] = stream
+                providers[stream] = secondary
+
+            winner, first_error = None, None
+            pending = set(streams)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        winner = task
+                        break
+                    first_error = first_error or error
+            if winner is None:
+                raise first_error
+
+            # Stop the loser right away, before relaying the winner, so it stops generating (and billing)
+            for task in [task for task in streams if task is not winner]:
+                await self._close_stream(task, streams.pop(task))
+
+            self._note_served(served, providers[streams[winner]], context)
+            if winner.exception():
+                return  # The winning stream finished without content
+            yield winner.result()
+            async for delta in streams[winner]:
+                yield delta
+        finally:
+            for task, stream in streams.items():
+                await self._close_stream(task, stream)
+
+    @staticmethod
+    async def _close_stream(task: asyncio.Future, stream: AsyncIterator[str]):
+        """Cancel a stream's pending read and close its generator (and HTTP response)"""
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        await stream.aclose()
+
+    async def _stream_once(self, provider: str, context: str, messages: List[Dict], max_tokens: Optional[int],
+                           temperature: Optional[float], timeout: Optional[float]) -> AsyncIterator[str]:
+        """Stream from one provider, tracking time-to-first-token and health"""
+        config, max_tokens, temperature, timeout = self._resolve_settings(
+            provider, context, 'stream', max_tokens, temperature, timeout
+        )
+        breaker = self.get_breaker(provider, config['models'][context])
+        breaker.before_call()  # Fails fast while the model is known to be down
+        started = time.monotonic()
+        reserved = estimate_request_tokens(messages, max_tokens)
+
+        try:
+            stream = await self._create(
+                config, context, messages, reserved,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout,
+                stream=True
+            )
+        except BaseException as e:
+            self._record_outcome(provider, e)
+            self._record_breaker(breaker, e)
+            self._record_latency(provider, context, 'stream', started, e, timeout)
+            raise
+
+        streamed_chars = 0
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not streamed_chars:
+                        self._record_latency(provider, context, 'stream', started)
+                    streamed_chars += len(delta)
+                    yield delta
+            self._record_outcome(provider, None)
+            self._record_breaker(breaker, None)
+        except openai.APITimeoutError as e:
+            self._record_outcome(provider, e)
+            self._record_breaker(breaker, e)
+            if not streamed_chars:  # Timed out waiting for the first token
+                self._record_latency(provider, context, 'stream', started, e, timeout)
+            raise asyncio.TimeoutError() from e
+        except BaseException as e:
+            self._record_outcome(provider, e)
+            self._record_breaker(breaker, e)
+            raise
+        finally:
+            await stream.close()
+            # Streams carry no usage block, so estimate what was actually spent
+            used = estimate_request_tokens(messages, 0) + streamed_chars // 4
+            admission.refund(provider, config['models'][context], reserved, used)
+
+    def reset(self, provider: Optional[str] = None):
+        """Drop cached clients (all, or one provider) so the next call rebuilds them"""
+        providers = [provider] if provider else list(self._clients.keys())
+        for name in providers:
+            cached = self._clients.pop(name, None)
+            if cached:
+                self._retire(cached[2])
+
+    def _retire(self, client):
+        """Close a client after a grace period without cutting off in-flight requests"""
+        async def close_later():
+            await asyncio.sleep(CLIENT_RETIRE_GRACE)
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"LLM client close error: {e}")
+
+        try:
+            asyncio.get_running_loop().create_task(close_later())
+        except RuntimeError:
+            pass  # No running loop (e.g. shutdown), let the client be garbage collected
+
+
+# Global gateway instance
+llm_gateway = LLMGateway()
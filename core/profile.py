@@ -0,0 +1,192 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Plain counters, stored as ints in slots
+INT_FIELDS = (
+    "level", "exp", "total_exp", "coins", "miaw_interactions", "sensei_interactions",
+    "vtuber_commands", "tsundere_reactions", "pat_count", "daily_streak"
+)
+# ISO date keys -> slot holding date.toordinal() (0 = never)
+DATE_FIELDS = {"last_daily": "last_daily_day", "last_daily_claim": "last_claim_day"}
+# ISO datetime keys -> slot holding epoch seconds
+TIME_FIELDS = {"created_at": "created_ts", "last_interaction": "last_interaction_ts"}
+
+# Newest unlocks remembered in order, so "recent achievements" isn't just catalog order
+RECENT_ACHIEVEMENTS = 3
+
+# Key order of the stored/JSON profile format
+PROFILE_KEYS = INT_FIELDS + ("last_daily", "achievements", "created_at", "last_interaction", "special_items")
+
+
+class AchievementCatalog:
+    """Maps achievement ids to bit positions for the per-profile bitset"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.bits: Dict[str, int] = {}
+
+    def bit(self, ach_id: str) -> int:
+        """Bit for an id, registering ids we haven't seen (e.g. removed from achievements.json)"""
+        bit = self.bits.get(ach_id)
+        if bit is None:
+            bit = self.bits[ach_id] = len(self.ids)
+            self.ids.append(ach_id)
+        return bit
+
+    def register(self, ach_ids: Iterable[str]):
+        for ach_id in ach_ids:
+            self.bit(ach_id)
+
+
+# Shared by every profile; bit order only lives in memory, storage keeps id lists
+achievement_catalog = AchievementCatalog()
+
+
+class AchievementSet:
+    """List-like view of a profile's achievement bitset (len, in, iteration, slicing, append)
+
+    Iterates in catalog order except for the most recent unlocks, which come
+    last in the order they were earned, so [-3:] are the latest three.
+    """
+
+    __slots__ = ("_profile",)
+
+    def __init__(self, profile: "Profile"):
+        self._profile = profile
+
+    def __contains__(self, ach_id) -> bool:
+        bit = achievement_catalog.bits.get(ach_id)
+        return bit is not None and bool(self._profile.achievement_bits >> bit & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        bits = self._profile.achievement_bits
+        recent = self._profile.recent_achievements
+        index = 0
+        while bits:
+            if bits & 1 and achievement_catalog.ids[index] not in recent:
+                yield achievement_catalog.ids[index]
+            bits >>= 1
+            index += 1
+        yield from (ach_id for ach_id in recent if ach_id in self)
+
+    def __len__(self) -> int:
+        return self._profile.achievement_bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return bool(self._profile.achievement_bits)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def append(self, ach_id: str):
+        if ach_id in self:
+            return
+        self._profile.achievement_bits |= 1 << achievement_catalog.bit(ach_id)
+        self._profile.recent_achievements = (self._profile.recent_achievements + (ach_id,))[-RECENT_ACHIEVEMENTS:]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class Profile:
+    """Gamification profile in slots instead of a dict, with the dict-style API commands use
+
+    Timestamps are kept as ints and achievements as a bitset; profile["created_at"]
+    and friends still read and write the ISO strings / id lists of the stored format.
+    """
+
+    __slots__ = INT_FIELDS + tuple(DATE_FIELDS.values()) + tuple(TIME_FIELDS.values()) + (
+        "achievement_bits", "recent_achievements", "special_items", "extra"
+    )
+
+    def __init__(self):
+        for field in INT_FIELDS:
+            setattr(self, field, 0)
+        self.level = 1
+        now = int(datetime.now().timestamp())
+        self.created_ts = now
+        self.last_interaction_ts = now
+        self.last_daily_day = 0
+        self.last_claim_day = 0
+        self.achievement_bits = 0  # Bit n set = achievement_catalog.ids[n] unlocked
+        self.recent_achievements = ()  # Latest unlocks, oldest first (stored as the tail of the id list)
+        self.special_items = None  # Rarely used, so no list per profile
+        self.extra: Optional[Dict] = None  # Keys this class doesn't know about
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Profile":
+        profile = cls()
+        for key, value in data.items():
+            profile[key] = value
+        return profile
+
+    def to_dict(self) -> Dict:
+        """Stored/JSON representation"""
+        data = {key: self[key] for key in PROFILE_KEYS}
+        data["achievements"] = list(self.achievements)
+        if self.last_claim_day:
+            data["last_daily_claim"] = self["last_daily_claim"]
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def snapshot(self, fields: Iterable[str]) -> Dict:
+        """JSON-ready values of some fields (for journal entries)"""
+        return {field: list(self.achievements) if field == "achievements" else self.get(field) for field in fields}
+
+    @property
+    def achievements(self) -> AchievementSet:
+        return AchievementSet(self)
+
+    def __getitem__(self, key: str):
+        if key in DATE_FIELDS:
+            ordinal = getattr(self, DATE_FIELDS[key])
+            return date.fromordinal(ordinal).isoformat() if ordinal else None
+        if key in TIME_FIELDS:
+            return datetime.fromtimestamp(getattr(self, TIME_FIELDS[key])).isoformat()
+        if key == "achievements":
+            return self.achievements
+        if key == "special_items":
+            return list(self.special_items or ())
+        if key in INT_FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key in DATE_FIELDS:
+            setattr(self, DATE_FIELDS[key], date.fromisoformat(value[:10]).toordinal() if value else 0)
+        elif key in TIME_FIELDS:
+            setattr(self, TIME_FIELDS[key], int(datetime.fromisoformat(value).timestamp()) if value else 0)
+        elif key == "achievements":
+            self.achievement_bits = 0
+            for ach_id in value:
+                self.achievement_bits |= 1 << achievement_catalog.bit(ach_id)
+            # Stored lists end with the latest unlocks (older files are in unlock order throughout)
+            self.recent_achievements = tuple(dict.fromkeys(reversed(value)))[:RECENT_ACHIEVEMENTS][::-1]
+        elif key == "special_items":
+            self.special_items = list(value) if value else None
+        elif key in INT_FIELDS:
+            setattr(self, key, int(value))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key == "last_daily_claim":
+            return bool(self.last_claim_day)
+        return key in PROFILE_KEYS or bool(self.extra and key in self.extra)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> List[str]:
+        return list(self.to_dict())
+
+    def __repr__(self):
+        return f"Profile({self.to_dict()!r})"
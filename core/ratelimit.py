@@ -0,0 +1,103 @@
+import time
+from typing import Dict, Hashable, List, Optional
+
+from discord.ext import commands
+
+# Idle keys are swept once a limiter holds this many (the threshold then follows its size)
+SWEEP_MIN_KEYS = 1024
+
+# Every limiter, so idle keys can be swept in one place
+limiters: List["RateLimiter"] = []
+
+
+class RateLimiter:
+    """GCRA (generic cell rate algorithm) limiter on time.monotonic()
+
+    Allows `rate` hits per `per` seconds with bursts up to `rate`. Each key
+    only stores its theoretical arrival time (TAT); a key whose TAT has passed
+    is indistinguishable from a new one, so idle keys are dropped in bulk.
+    """
+
+    def __init__(self, name: str, rate: int, per: float):
+        self.name = name
+        self.rate = rate
+        self.per = per
+        self.interval = per / rate  # Emission interval T
+        self.tolerance = per - self.interval  # Burst tolerance tau
+        self.tat: Dict[Hashable, float] = {}
+        self.sweep_at = SWEEP_MIN_KEYS
+        self.allowed = 0
+        self.limited = 0
+        limiters.append(self)
+
+    def retry_after(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Seconds until key may hit again, without spending anything (0 = allowed now)"""
+        now = time.monotonic() if now is None else now
+        tat = self.tat.get(key)
+        if tat is None:
+            return 0.0
+        return max(0.0, tat - self.tolerance - now)
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Spend one hit for key; returns 0 if allowed, else seconds to wait"""
+        now = time.monotonic() if now is None else now
+        tat = self.tat.get(key, now)
+        if tat < now:
+            tat = now
+        wait = tat - self.tolerance - now
+        if wait > 0:
+            self.limited += 1
+            return wait
+
+        self.tat[key] = tat + self.interval
+        self.allowed += 1
+        if len(self.tat) >= self.sweep_at:
+            self.evict_idle(now)
+        return 0.0
+
+    def block(self, key: Hashable, seconds: float, now: Optional[float] = None):
+        """Refuse key for the next `seconds`, e.g. until a daily reset"""
+        now = time.monotonic() if now is None else now
+        self.tat[key] = now + seconds + self.tolerance
+
+    def reset(self, key: Hashable):
+        self.tat.pop(key, None)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop keys that have fully recovered; returns how many were removed"""
+        now = time.monotonic() if now is None else now
+        idle = [key for key, tat in self.tat.items() if tat <= now]
+        for key in idle:
+            del self.tat[key]
+        self.sweep_at = max(SWEEP_MIN_KEYS, len(self.tat) * 2)
+        return len(idle)
+
+    def __len__(self):
+        return len(self.tat)
+
+
+def evict_idle_all() -> int:
+    """Sweep idle keys from every limiter"""
+    now = time.monotonic()
+    return sum(limiter.evict_idle(now) for limiter in limiters)
+
+
+def rate_limit(rate: int, per: float, type: commands.BucketType = commands.BucketType.user):
+    """Per-command cooldown backed by a RateLimiter, drop-in for @commands.cooldown
+
+    Runs as the command's before-invoke hook rather than a check, so listing
+    commands in !help doesn't spend a hit. Raises CommandOnCooldown like
+    discord.py's cooldowns, so existing error handlers keep working.
+    """
+    def decorator(func):
+        callback = func.callback if isinstance(func, commands.Command) else func
+        limiter = RateLimiter(callback.__name__, rate, per)
+
+        async def spend(ctx):
+            retry_after = limiter.hit(type.get_key(ctx))
+            if retry_after:
+                raise commands.CommandOnCooldown(commands.Cooldown(rate, per), retry_after, type)
+
+        return commands.before_invoke(spend)(func)
+
+    return decorator
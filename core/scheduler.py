@@ -0,0 +1,134 @@
+import asyncio
+import inspect
+import random
+import time
+from typing import Callable, Dict, Optional
+
+from core.globals import MAINTENANCE_JITTER, MAINTENANCE_SLICE_BUDGET, MAINTENANCE_RUN_BUDGET
+
+
+class Job:
+    """A periodic maintenance job and its run statistics
+
+    work is a plain function, a coroutine function, or a generator function
+    that yields after each bounded slice of work. Generator jobs that use up
+    their run budget pick up where they stopped on the next tick.
+    """
+
+    def __init__(self, name: str, interval: float, work: Callable,
+                 slice_budget: float = MAINTENANCE_SLICE_BUDGET, run_budget: float = MAINTENANCE_RUN_BUDGET):
+        self.name = name
+        self.interval = interval
+        self.work = work
+        self.slice_budget = slice_budget  # Longest a slice may block the event loop
+        self.run_budget = run_budget  # Work per tick before a sliced job pauses
+        self.pending = None  # Unfinished generator of a sliced job
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.slices = 0
+        self.overruns = 0
+        self.errors = 0
+        self.max_slice = 0.0
+
+    def next_delay(self) -> float:
+        """Interval with jitter, so jobs don't all fire on the same tick"""
+        if self.pending is not None:
+            return min(1.0, self.interval)  # Resume a paused sweep soon
+        return self.interval * random.uniform(1 - MAINTENANCE_JITTER, 1 + MAINTENANCE_JITTER)
+
+
+class MaintenanceScheduler:
+    """Runs housekeeping jobs periodically on the event loop, in small slices"""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+
+    def add(self, name: str, interval: float, work: Callable, **budgets) -> Job:
+        """Register a job (re-registering a name replaces it); starts it if the scheduler runs"""
+        self.remove(name)
+        job = self.jobs[name] = Job(name, interval, work, **budgets)
+        if self.running:
+            self._start(job)
+        return job
+
+    def remove(self, name: str):
+        job = self.jobs.pop(name, None)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+
+    @property
+    def running(self) -> bool:
+        return any(job.task is not None and not job.task.done() for job in self.jobs.values())
+
+    def start(self):
+        """Start every registered job that isn't running yet"""
+        for job in self.jobs.values():
+            if job.task is None or job.task.done():
+                self._start(job)
+
+    def _start(self, job: Job):
+        job.task = asyncio.get_running_loop().create_task(self._loop(job))
+
+    async def _loop(self, job: Job):
+        # Random first delay spreads the jobs out instead of running them all at startup
+        await asyncio.sleep(random.uniform(0, job.interval))
+        while True:
+            try:
+                await self.run_once(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.errors += 1
+                job.pending = None
+                print(f"⚠️ Maintenance job '{job.name}' failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(job.next_delay())
+
+    async def run_once(self, job: Job):
+        """Run one tick of a job within its budgets"""
+        job.runs += 1
+        if job.pending is None:
+            started = time.monotonic()
+            result = job.work()
+            if inspect.isawaitable(result):
+                await result
+            elif inspect.isgenerator(result):
+                job.pending = result
+            if job.pending is None:
+                self._record_slice(job, time.monotonic() - started)
+                return
+
+        run_started = time.monotonic()
+        while time.monotonic() - run_started < job.run_budget:
+            started = time.monotonic()
+            try:
+                next(job.pending)
+            except StopIteration:
+                job.pending = None
+                self._record_slice(job, time.monotonic() - started)
+                return
+            self._record_slice(job, time.monotonic() - started)
+            await asyncio.sleep(0)  # Let the gateway run between slices
+
+    def _record_slice(self, job: Job, elapsed: float):
+        job.slices += 1
+        job.max_slice = max(job.max_slice, elapsed)
+        if elapsed > job.slice_budget:
+            job.overruns += 1
+            print(f"⏱️ Maintenance job '{job.name}' blocked the event loop for {elapsed * 1000:.1f}ms "
+                  f"(budget {job.slice_budget * 1000:.0f}ms)")
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "runs": job.runs,
+                "slices": job.slices,
+                "overruns": job.overruns,
+                "errors": job.errors,
+                "max_slice_ms": job.max_slice * 1000
+            }
+            for name, job in self.jobs.items()
+        }
+
+
+# Global scheduler instance
+maintenance = MaintenanceScheduler()
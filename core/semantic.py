@@ -0,0 +1,152 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.globals import SEMANTIC_INDEX_DIM, SEMANTIC_INDEX_CAPACITY, SEMANTIC_SIMILARITY_THRESHOLD
+
+# NumPy is optional, without it !sensei only uses the exact-match cache
+try:
+    import numpy as np
+    SEMANTIC_CACHE_ENABLED = True
+except ImportError:
+    np = None
+    SEMANTIC_CACHE_ENABLED = False
+
+
+def extract_features(normalized: str, dim: int) -> Dict[int, float]:
+    """Hashed word + character trigram features with log-scaled term frequency"""
+    counts: Dict[int, int] = {}
+    for word in normalized.split():
+        features = [f"w:{word}"]
+        padded = f"#{word}#"
+        # Trigrams make "fotosintesis" and "berfotosintesis" overlap
+        features.extend(f"g:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        for feature in features:
+            bucket = hash(feature) % dim
+            counts[bucket] = counts.get(bucket, 0) + 1
+    return {bucket: 1.0 + math.log(count) for bucket, count in counts.items()}
+
+
+def exact_tokens(normalized: str) -> Tuple[str, ...]:
+    """Numbers and symbols in a question; "perang dunia 1" and "... 2" must not share an answer"""
+    return tuple(sorted(word for word in normalized.split() if not word.isalpha()))
+
+
+class SemanticIndex:
+    """In-process TF-IDF index of answered questions for near-duplicate lookup
+
+    Rows live in a fixed-size NumPy matrix used as a ring buffer; a lookup is
+    one matrix-vector product over all rows. Trigrams barely tell "1" from "2",
+    so a hit also needs the same numbers and symbols as the query.
+    """
+
+    def __init__(self, dim: int = SEMANTIC_INDEX_DIM, capacity: int = SEMANTIC_INDEX_CAPACITY,
+                 threshold: float = SEMANTIC_SIMILARITY_THRESHOLD):
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.hits = 0
+        self.lookups = 0
+        if not SEMANTIC_CACHE_ENABLED:
+            return
+
+        self._tf = np.zeros((capacity, dim), dtype=np.float32)
+        self._tf_sq = np.zeros((capacity, dim), dtype=np.float32)  # Kept for cheap row norms
+        self._df = np.zeros(dim, dtype=np.float32)  # Document frequency per feature
+        self._expires = np.zeros(capacity, dtype=np.float64)  # 0 marks an empty slot
+        self._scopes = np.full(capacity, -1, dtype=np.int32)
+        self._scope_ids: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._exact: List[Optional[Tuple[str, ...]]] = [None] * capacity
+        self._next = 0
+        self._count = 0
+
+    def _scope_id(self, scope: str) -> int:
+        if scope not in self._scope_ids:
+            self._scope_ids[scope] = len(self._scope_ids)
+        return self._scope_ids[scope]
+
+    def _vector(self, normalized: str):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for bucket, weight in extract_features(normalized, self.dim).items():
+            vector[bucket] = weight
+        return vector
+
+    def _idf(self):
+        return np.log((1.0 + self._count) / (1.0 + self._df)) + 1.0
+
+    def add(self, normalized: str, cache_key: str, scope: str, ttl: float):
+        """Index an answered question; cache_key points at its answer in the exact cache"""
+        if not SEMANTIC_CACHE_ENABLED or not normalized:
+            return
+
+        slot = self._next
+        self._next = (self._next + 1) % self.capacity
+        if self._expires[slot]:
+            # Ring buffer is full, forget the oldest row
+            self._df -= self._tf[slot] > 0
+            self._count -= 1
+
+        vector = self._vector(normalized)
+        self._tf[slot] = vector
+        self._tf_sq[slot] = vector * vector
+        self._df += vector > 0
+        self._count += 1
+        self._expires[slot] = time.time() + ttl
+        self._scopes[slot] = self._scope_id(scope)
+        self._keys[slot] = cache_key
+        self._exact[slot] = exact_tokens(normalized)
+
+    def lookup(self, normalized: str, scope: str) -> Optional[str]:
+        """Get the cache key of the most similar live question, if it clears the threshold"""
+        if not SEMANTIC_CACHE_ENABLED or not normalized or not self._count:
+            return None
+        self.lookups += 1
+
+        query = self._vector(normalized)
+        idf = self._idf()
+        weighted_query = query * idf
+        query_norm = float(np.linalg.norm(weighted_query))
+        if query_norm == 0.0:
+            return None
+
+        # cos(q, d) = (tf_d . (q * idf^2)) / (|d * idf| * |q * idf|)
+        dots = self._tf @ (weighted_query * idf)
+        row_norms = np.sqrt(self._tf_sq @ (idf * idf))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = dots / (row_norms * query_norm)
+
+        live = (self._expires > time.time()) & (self._scopes == self._scope_ids.get(scope, -2))
+        similarity = np.where(live, np.nan_to_num(similarity), -1.0)
+
+        # Best candidate over the threshold whose numbers and symbols match the query's
+        exact = exact_tokens(normalized)
+        candidates = np.nonzero(similarity >= self.threshold)[0]
+        for slot in candidates[np.argsort(-similarity[candidates])]:
+            if self._exact[slot] == exact:
+                self.hits += 1
+                return self._keys[slot]
+        return None
+
+    def purge_expired(self) -> int:
+        """Free slots whose answers expired, returns how many were removed"""
+        if not SEMANTIC_CACHE_ENABLED:
+            return 0
+        expired = np.nonzero((self._expires > 0) & (self._expires <= time.time()))[0]
+        for slot in expired:
+            self._df -= self._tf[slot] > 0
+            self._tf[slot] = 0
+            self._tf_sq[slot] = 0
+            self._expires[slot] = 0
+            self._scopes[slot] = -1
+            self._keys[slot] = None
+            self._exact[slot] = None
+            self._count -= 1
+        return len(expired)
+
+    def __len__(self):
+        return self._count if SEMANTIC_CACHE_ENABLED else 0
+
+
+# Near-duplicate index over answered !sensei questions
+sensei_semantic_index = SemanticIndex()
@@ -0,0 +1,228 @@
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Hashable, Iterator, List, Optional
+
+from core.history import estimate_tokens, message_tokens
+
+
+class History(deque):
+    """Ring buffer of conversation turns (deque with maxlen)
+
+    A compacted summary at the front survives wrap-around: once the buffer is
+    full, appending drops the oldest turn after it instead. Keeps a running
+    token estimate and reports changes to the SessionBudget it belongs to.
+    """
+
+    def __init__(self, iterable=(), maxlen: Optional[int] = None):
+        super().__init__(iterable, maxlen)
+        self.tokens = sum(message_tokens(message) for message in self)
+        self.budget: Optional["SessionBudget"] = None
+
+    def _resize(self, tokens: int):
+        self.tokens += tokens
+        if self.budget is not None:
+            self.budget.charge(tokens)
+
+    def append(self, message: Dict):
+        if self.maxlen and len(self) == self.maxlen:
+            if self.maxlen > 1 and self[0].get("summary"):
+                summary = self.popleft()
+                self.popleft()
+                self.appendleft(summary)
+            else:
+                self.popleft()  # What the deque would drop anyway, but counted
+        super().append(message)
+        self._resize(message_tokens(message))
+
+    def appendleft(self, message: Dict):
+        if self.maxlen and len(self) == self.maxlen:
+            self._resize(-message_tokens(self[-1]))  # Dropped from the right by the deque
+        super().appendleft(message)
+        self._resize(message_tokens(message))
+
+    def popleft(self) -> Dict:
+        message = super().popleft()
+        self._resize(-message_tokens(message))
+        return message
+
+    def clear(self):
+        super().clear()
+        self._resize(-self.tokens)
+
+
+def value_tokens(value) -> int:
+    """Estimated size of a session value; Histories keep a running count"""
+    tokens = getattr(value, "tokens", None)
+    return tokens if tokens is not None else estimate_tokens(str(value))
+
+
+class SessionBudget:
+    """Memory bound, in estimated tokens, shared by several SessionStores
+
+    Once the total passes max_tokens the least recently active user across all
+    the stores is evicted, whichever store they are in.
+    """
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.used = 0
+        self.evictions = 0
+        self.stores: List["SessionStore"] = []
+
+    def charge(self, tokens: int):
+        self.used += tokens
+        if self.used > self.max_tokens:
+            self.enforce()
+
+    def attach(self, value):
+        if isinstance(value, History):
+            value.budget = self
+        self.charge(value_tokens(value))
+
+    def release(self, value):
+        if isinstance(value, History):
+            value.budget = None
+        self.used -= value_tokens(value)
+
+    def enforce(self):
+        """Evict least recently used sessions until the total fits"""
+        while self.used > self.max_tokens:
+            oldest = min(
+                (store for store in self.stores if store._entries),
+                key=lambda store: store.last_used_oldest(),
+                default=None
+            )
+            if oldest is None:
+                break
+            oldest.evict_oldest()
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"used": self.used, "max_tokens": self.max_tokens, "evictions": self.evictions}
+
+
+class SessionStore:
+    """Per-user session state with LRU eviction past max_entries and an idle TTL
+
+    Dict-like (in, [], get, del, len, keys/values/items). Reading or writing a
+    user refreshes their TTL and recency; peek() and the bulk views don't.
+    With a budget, the size of every value also counts against that shared cap.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float, factory: Optional[Callable] = None,
+                 budget: Optional[SessionBudget] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.factory = factory  # Builds the value get_or_create() stores for a new user
+        self.budget = budget
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value), least recent first
+        self.evictions = 0  # Dropped for the size cap or the memory budget
+        self.expirations = 0  # Dropped after ttl idle
+        if budget is not None:
+            budget.stores.append(self)
+
+    def _remove(self, key: Hashable):
+        _, value = self._entries.pop(key)
+        if self.budget is not None:
+            self.budget.release(value)
+        return value
+
+    def _live(self, key: Hashable, now: float):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._live(key, time.monotonic()) is not None
+
+    def __getitem__(self, key: Hashable):
+        now = time.monotonic()
+        entry = self._live(key, now)
+        if entry is None:
+            raise KeyError(key)
+        self._entries[key] = (now + self.ttl, entry[1])
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def __setitem__(self, key: Hashable, value):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        while len(self._entries) > self.max_entries:
+            self.evict_oldest()
+        if self.budget is not None:
+            self.budget.attach(value)
+
+    def __delitem__(self, key: Hashable):
+        self._remove(key)
+
+    def last_used_oldest(self) -> float:
+        """When the least recently active user was last active (monotonic clock)"""
+        return next(iter(self._entries.values()))[0] - self.ttl
+
+    def evict_oldest(self):
+        self._remove(next(iter(self._entries)))
+        self.evictions += 1
+
+    def get(self, key: Hashable, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def peek(self, key: Hashable, default=None):
+        """Current value without refreshing recency or TTL"""
+        entry = self._live(key, time.monotonic())
+        return default if entry is None else entry[1]
+
+    def get_or_create(self, key: Hashable):
+        """Value for key, creating it with the factory if missing"""
+        try:
+            return self[key]
+        except KeyError:
+            value = self[key] = self.factory()
+            return value
+
+    def pop(self, key: Hashable, default=None):
+        return self._remove(key) if key in self._entries else default
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        """Drop sessions idle past the TTL (at most limit of them), returns how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        # Least recently used first, so the expired ones sit at the front
+        while self._entries and (limit is None or removed < limit):
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def keys(self):
+        return self._entries.keys()
+
+    def values(self) -> Iterator:
+        return (value for _, value in self._entries.values())
+
+    def items(self) -> Iterator:
+        return ((key, value) for key, (_, value) in self._entries.items())
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
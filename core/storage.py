@@ -0,0 +1,429 @@
+import abc
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.globals import JOURNAL_COMPACT_EVERY
+
+# Profile fields stored in their own indexed columns
+INDEXED_FIELDS = ("level", "total_exp", "coins", "miaw_interactions")
+
+
+def write_json_atomic(path: str, data: Dict):
+    """Dump data to a temp file and rename it over path, so readers never see a half-written file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+class ProfileStore(abc.ABC):
+    """Where gamification profiles live on disk
+
+    A backend must implement load, save_many and iter_profiles; leaving one
+    out fails when the store is created rather than on first use.
+    """
+
+    append_only = False  # True when record() is the primary write path
+    ranked_fields: Tuple[str, ...] = ()  # Fields top()/rank_of() can answer straight from storage
+
+    @abc.abstractmethod
+    def load(self, user_id: str) -> Optional[Dict]:
+        """Get one profile, or None if the user has none yet"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save_many(self, profiles: Dict[str, Dict]):
+        """Write the given profiles (user_id -> profile) in one go"""
+        raise NotImplementedError
+
+    def record(self, event: str, user_id: str, fields: Dict):
+        """Note a state change as it happens (only the journal backend uses this)"""
+        pass
+
+    def write_pending(self):
+        """Write out anything record() queued (called from the writer thread)"""
+        pass
+
+    @abc.abstractmethod
+    def iter_profiles(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (user_id, profile) for every stored user"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        return sum(1 for _ in self.iter_profiles())
+
+    def top(self, field: str, offset: int, limit: int) -> List[Tuple[str, int]]:
+        """(user_id, score) pairs of a ranked field, highest first (only for ranked_fields)"""
+        raise NotImplementedError
+
+    def rank_of(self, field: str, user_id: str) -> Optional[Tuple[int, int]]:
+        """0-based rank and score of a user in a ranked field, or None if they have no profile"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonProfileStore(ProfileStore):
+    """Legacy backend: every profile in one JSON file, rewritten on each save"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                self.data = {}
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        return self.data.get(user_id)
+
+    def save_many(self, profiles: Dict[str, Dict]):
+        self.data.update(profiles)
+        write_json_atomic(self.path, self.data)
+
+    def iter_profiles(self) -> Iterator[Tuple[str, Dict]]:
+        return iter(list(self.data.items()))
+
+    def count(self) -> int:
+        return len(self.data)
+
+
+class SqliteProfileStore(ProfileStore):
+    """One row per user in SQLite (WAL mode); saves upsert only the changed rows
+
+    The event loop reads through its own connection and the writer thread writes
+    through another. WAL lets readers run while a write transaction is open, so
+    a profile load never waits for a save.
+    """
+
+    ranked_fields = INDEXED_FIELDS
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = self._connect()  # Reads, event loop only
+        self._write_conn: Optional[sqlite3.Connection] = None  # Opened by the first save_many
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "user_id TEXT PRIMARY KEY, level INTEGER NOT NULL DEFAULT 1, "
+            "total_exp INTEGER NOT NULL DEFAULT 0, coins INTEGER NOT NULL DEFAULT 0, "
+            "miaw_interactions INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL)"
+        )
+        for field in INDEXED_FIELDS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_profiles_{field} ON profiles ({field} DESC)")
+        self.conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Each connection is used by one thread at a time; close() may come from another
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, far fewer fsyncs
+        return conn
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, profiles: Dict[str, Dict]):
+        rows = [
+            (user_id, *(int(profile.get(field, 0)) for field in INDEXED_FIELDS),
+             json.dumps(profile, ensure_ascii=False, separators=(',', ':')))
+            for user_id, profile in profiles.items()
+        ]
+        if self._write_conn is None:
+            self._write_conn = self._connect()
+        with self._write_conn:  # One transaction for the whole batch
+            self._write_conn.executemany(
+                "INSERT INTO profiles (user_id, level, total_exp, coins, miaw_interactions, data) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(user_id) DO UPDATE SET "
+                "level = excluded.level, total_exp = excluded.total_exp, coins = excluded.coins, "
+                "miaw_interactions = excluded.miaw_interactions, data = excluded.data",
+                rows
+            )
+
+    def iter_profiles(self) -> Iterator[Tuple[str, Dict]]:
+        # Own connection, so a long scan (e.g. from an executor) never shares one with the loop
+        conn = self._connect()
+        try:
+            for user_id, data in conn.execute("SELECT user_id, data FROM profiles"):
+                yield user_id, json.loads(data)
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def top(self, field: str, offset: int, limit: int) -> List[Tuple[str, int]]:
+        # Same tie order as the in-memory leaderboards: score desc, then user id
+        return self.conn.execute(
+            f"SELECT user_id, {field} FROM profiles ORDER BY {field} DESC, user_id LIMIT ? OFFSET ?",
+            (limit, offset)
+        ).fetchall()
+
+    def rank_of(self, field: str, user_id: str) -> Optional[Tuple[int, int]]:
+        row = self.conn.execute(f"SELECT {field} FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        score = row[0]
+        ahead = self.conn.execute(
+            f"SELECT COUNT(*) FROM profiles WHERE {field} > ? OR ({field} = ? AND user_id < ?)",
+            (score, score, user_id)
+        ).fetchone()[0]
+        return ahead, score
+
+    def close(self):
+        if self._write_conn is not None:
+            self._write_conn.close()
+        self.conn.close()
+
+
+class JournalProfileStore(ProfileStore):
+    """Append-only event journal plus a periodic snapshot
+
+    Every change is one JSON line {"t", "e", "u", "f"} holding the new values
+    of the fields it touched, so replaying a line twice is harmless. Startup
+    loads the snapshot and replays the journal on top of it.
+
+    record() only queues the line; the writer thread appends it, so the file
+    and self.data are only ever changed from that thread after startup. Reads
+    from other threads (load, iter_profiles, count) take _data_lock, which the
+    writer holds while it applies entries to self.data.
+    """
+
+    append_only = True
+
+    def __init__(self, snapshot_path: str, journal_path: str, compact_every: int):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.data = JsonProfileStore(snapshot_path).data
+        self.lines = self._replay()
+        self._journal = open(journal_path, 'a', encoding='utf-8')
+        self._pending = []  # (user_id, fields, line) waiting for the writer thread
+        self._pending_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+
+    def _replay(self) -> int:
+        if not os.path.exists(self.journal_path):
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            return 0
+
+        lines = 0
+        good_bytes = 0  # Offset just past the last complete entry
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn last line from a crash, everything before it is intact
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                self.data.setdefault(entry["u"], {}).update(entry["f"])
+                lines += 1
+                good_bytes += len(line)
+
+        # Cut the torn tail off, or the next append would be glued onto it and lost on replay
+        size = os.path.getsize(self.journal_path)
+        if good_bytes < size:
+            print(f"⚠️ Dropping {size - good_bytes} bytes of torn gamification journal tail")
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+        if lines:
+            print(f"📜 Replayed {lines} gamification journal entries")
+        return lines
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        # A copy, so save_many can tell which changes never went through record()
+        with self._data_lock:
+            profile = self.data.get(user_id)
+            return copy.deepcopy(profile) if profile is not None else None
+
+    def record(self, event: str, user_id: str, fields: Dict):
+        line = json.dumps(
+            {"t": int(time.time()), "e": event, "u": user_id, "f": fields},
+            ensure_ascii=False, separators=(',', ':')
+        ) + "\n"
+        with self._pending_lock:
+            self._pending.append((user_id, copy.deepcopy(fields), line))
+
+    def write_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        with self._data_lock:
+            for user_id, fields, _ in pending:
+                self.data.setdefault(user_id, {}).update(fields)
+        for _, _, line in pending:
+            self._journal.write(line)
+        self._journal.flush()  # Hand the lines to the OS; fsync happens on save
+        self.lines += len(pending)
+
+    def save_many(self, profiles: Dict[str, Dict]):
+        self.write_pending()
+        # Events were already appended via record(); pick up anything changed without one
+        for user_id, profile in profiles.items():
+            if self.data.get(user_id) != profile:
+                self.record("profile_saved", user_id, profile)
+        self.write_pending()
+        os.fsync(self._journal.fileno())
+        if self.lines >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and start a new journal
+
+        The old journal is kept as *.1 for auditing until the next compaction.
+        """
+        write_json_atomic(self.snapshot_path, self.data)  # A crash here just replays the old journal
+
+        self._journal.close()
+        os.replace(self.journal_path, f"{self.journal_path}.1")
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        print(f"🗜️ Compacted {self.lines} journal entries into {self.snapshot_path}")
+        self.lines = 0
+
+    def iter_profiles(self) -> Iterator[Tuple[str, Dict]]:
+        # Shallow copies: the writer replaces field values, it never mutates them in place
+        with self._data_lock:
+            return iter([(user_id, dict(profile)) for user_id, profile in self.data.items()])
+
+    def count(self) -> int:
+        with self._data_lock:
+            return len(self.data)
+
+    def close(self):
+        self.write_pending()
+        self._journal.close()
+
+
+class StoreWriter:
+    """Dedicated thread that writes profile snapshots so the event loop never waits on disk
+
+    submit() coalesces: if a user is submitted again before the thread gets to
+    them, only the newest snapshot is written.
+    """
+
+    def __init__(self, store: ProfileStore):
+        self.store = store
+        self._pending: Dict[str, Dict] = {}
+        self._cond = threading.Condition()
+        self._wake = False
+        self._busy = False
+        self._closed = False
+        self.writes = 0
+        self.coalesced = 0
+        self._thread = threading.Thread(target=self._run, name="gamification-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, profiles: Dict[str, Dict]):
+        """Queue immutable profile snapshots (user_id -> dict) for writing"""
+        with self._cond:
+            self.coalesced += sum(1 for user_id in profiles if user_id in self._pending)
+            self._pending.update(profiles)
+            self._wake = True
+            self._cond.notify()
+
+    def wake(self):
+        """Let the thread write queued journal lines without waiting for the next submit"""
+        with self._cond:
+            self._wake = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._wake and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._wake and not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._wake = False
+                self._busy = True
+            try:
+                self.store.write_pending()
+                if batch:
+                    self.store.save_many(batch)
+                    self.writes += 1
+            except Exception as e:
+                print(f"Error saving user data: {e}")
+                with self._cond:
+                    # Retry later, unless a newer snapshot of the same user arrived meanwhile
+                    for user_id, profile in batch.items():
+                        self._pending.setdefault(user_id, profile)
+                time.sleep(1.0)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is written"""
+        with self._cond:
+            self._wake = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._wake and not self._busy and not self._pending, timeout)
+
+    async def flush(self, timeout: Optional[float] = 30.0) -> bool:
+        """Awaitable drain(), for shutdown paths running on the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.drain, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Write what's left, stop the thread and close the store"""
+        self.drain(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.store.close()
+
+
+def migrate_json_to_sqlite(json_path: str, store: SqliteProfileStore) -> int:
+    """One-shot import of the legacy JSON file into an empty SQLite store
+
+    The JSON file is renamed to *.migrated afterwards so it is never imported twice.
+    """
+    if not os.path.exists(json_path) or store.count():
+        return 0
+
+    legacy = JsonProfileStore(json_path)
+    if legacy.data:
+        store.save_many(legacy.data)
+    os.replace(json_path, f"{json_path}.migrated")
+    print(f"📦 Migrated {len(legacy.data)} gamification profiles from {json_path} to SQLite")
+    return len(legacy.data)
+
+
+def create_store(backend: str, data_dir: str = "data") -> ProfileStore:
+    """Build the profile store selected by GAMIFICATION_BACKEND"""
+    json_path = os.path.join(data_dir, "gamification.json")
+    if backend == "json":
+        return JsonProfileStore(json_path)
+    if backend == "sqlite":
+        store = SqliteProfileStore(os.path.join(data_dir, "gamification.db"))
+        migrate_json_to_sqlite(json_path, store)
+        return store
+    if backend == "journal":
+        snapshot_path = os.path.join(data_dir, "gamification.snapshot.json")
+        if not os.path.exists(snapshot_path) and os.path.exists(json_path):
+            write_json_atomic(snapshot_path, JsonProfileStore(json_path).data)  # Seed from the legacy file
+        return JournalProfileStore(
+            snapshot_path,
+            os.path.join(data_dir, "gamification.journal"),
+            JOURNAL_COMPACT_EVERY
+        )
+    raise ValueError(f"Unknown gamification backend: {backend}")
@@ -0,0 +1,120 @@
+import re
+import time
+from typing import Callable, List, Optional
+
+from core.globals import MAX_CHUNK_SIZE, STREAM_EDIT_INTERVAL
+
+# An unfinished <think> block at the tail of a stream (closing tag not received yet)
+OPEN_THINK_RE = re.compile(r'<think>(?!.*</think>).*\Z', re.DOTALL | re.IGNORECASE)
+
+
+def split_message(text: str, limit: int = MAX_CHUNK_SIZE) -> List[str]:
+    """Split text into Discord-sized chunks, preferring line boundaries"""
+    chunks = []
+    current_chunk = ""
+
+    for line in text.split('\n'):
+        # Hard-split lines that would never fit in a single message
+        while len(line) > limit:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+
+        if len(current_chunk + line + '\n') <= limit:
+            current_chunk += line + '\n'
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = line + '\n'
+
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+class StreamingReply:
+    """Progressively render a streamed LLM answer into Discord messages"""
+
+    def __init__(self, ctx, clean: Optional[Callable[[str], str]] = None,
+                 embed_factory: Optional[Callable] = None,
+                 interval: float = STREAM_EDIT_INTERVAL):
+        self.ctx = ctx
+        self.clean = clean
+        self.embed_factory = embed_factory  # Renders the first page as an embed if set
+        self.interval = interval
+        self.parts = []
+        self.messages = []  # Sent discord.Message objects, one per page
+        self.rendered = []  # Page text currently shown in each message
+        self.last_flush = 0.0
+
+    @property
+    def started(self) -> bool:
+        """Whether anything is visible to the user yet"""
+        return bool(self.messages)
+
+    def visible_text(self) -> str:
+        """Text that should be shown right now (reasoning blocks hidden)"""
+        text = OPEN_THINK_RE.sub('', ''.join(self.parts))
+        return self.clean(text) if self.clean else text.strip()
+
+    async def feed(self, delta: str):
+        """Add a streamed delta, editing the reply at most once per interval"""
+        self.parts.append(delta)
+        # The first visible token is flushed immediately, later ones are rate bounded
+        if not self.started or time.monotonic() - self.last_flush >= self.interval:
+            await self.flush()
+
+    async def finish(self, fallback: str = "") -> str:
+        """Render the final text and return it"""
+        if fallback and not self.visible_text():
+            self.parts = [fallback]
+        await self.flush()
+        return self.visible_text()
+
+    async def flush(self):
+        """Sync the sent messages with the current text, rolling over past the size limit"""
+        text = self.visible_text()
+        if not text:
+            return
+
+        pages = split_message(text)
+        for i, page in enumerate(pages):
+            if i >= len(self.messages):
+                await self._send(i, page)
+            elif self.rendered[i] != page:
+                await self._edit(i, page)
+
+        # Text can shrink once a think block or citation gets cleaned away
+        while len(self.messages) > len(pages):
+            message = self.messages.pop()
+            self.rendered.pop()
+            try:
+                await message.delete()
+            except Exception:
+                pass
+
+        self.last_flush = time.monotonic()
+
+    async def _send(self, index: int, page: str):
+        if index == 0:
+            if self.embed_factory:
+                message = await self.ctx.reply(embed=self.embed_factory(page))
+            else:
+                message = await self.ctx.reply(page)
+        else:
+            message = await self.ctx.send(page)
+        self.messages.append(message)
+        self.rendered.append(page)
+
+    async def _edit(self, index: int, page: str):
+        try:
+            if index == 0 and self.embed_factory:
+                await self.messages[index].edit(embed=self.embed_factory(page))
+            else:
+                await self.messages[index].edit(content=page)
+            self.rendered[index] = page
+        except Exception as e:
+            print(f"Streaming edit error: {e}")
@@ -0,0 +1,100 @@
+import asyncio
+from itertools import islice
+from typing import Dict, List
+
+from core.admission import admission
+from core.globals import conversation_histories, get_llm_config, COMPACTION_KEEP_RECENT, COMPACTION_HEADROOM
+from core.history import message_tokens
+from core.llm import llm_gateway
+from core.session import History
+
+SUMMARY_PROMPT = """Ringkas percakapan berikut dalam maksimal 5 kalimat bahasa Indonesia.
+Simpan fakta penting tentang user (nama, preferensi, janji, topik yang sedang dibahas) dan
+abaikan basa-basi. Jika ada ringkasan sebelumnya, gabungkan isinya ke ringkasan baru."""
+
+
+def format_transcript(messages: List[Dict]) -> str:
+    """Render history messages as a plain transcript for the summarizer"""
+    lines = []
+    for message in messages:
+        if message.get("summary"):
+            lines.append(f"[Ringkasan sebelumnya] {message['content']}")
+        else:
+            speaker = "User" if message["role"] == "user" else "Bot"
+            lines.append(f"{speaker}: {message['content']}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """Summarizes old turns into one memory message, off the reply path"""
+
+    def __init__(self):
+        self._running = set()  # (context, user_id) currently being compacted
+        self._slots = asyncio.Semaphore(1)  # Low priority: one summary at a time
+
+    def maybe_schedule(self, context: str, user_id):
+        """Queue a background compaction before turns get lost
+
+        Turns are lost either to the ring buffer (the oldest is dropped once it
+        is full) or to pack_history (turns past the history_tokens budget).
+        """
+        history = conversation_histories[context].peek(user_id)
+        key = (context, user_id)
+        if not history or key in self._running:
+            return
+        nearly_full = history.maxlen and len(history) >= history.maxlen - COMPACTION_HEADROOM
+        if not nearly_full:
+            budget = get_llm_config(llm_gateway.primary_provider())['settings'][context]['history_tokens']
+            if sum(message_tokens(message) for message in history if not message.get("summary")) <= budget:
+                return
+
+        self._running.add(key)
+        try:
+            asyncio.get_running_loop().create_task(self._compact(context, user_id, history))
+        except RuntimeError:
+            self._running.discard(key)
+
+    async def _compact(self, context: str, user_id, history: History):
+        try:
+            async with self._slots:
+                # Snapshot the turns to fold; the newest ones stay verbatim
+                old_turns = list(islice(history, len(history) - COMPACTION_KEEP_RECENT))
+                if len(old_turns) < 2:
+                    return
+
+                # Replies come first: with calls queued for the model, leave it for a later turn
+                provider = llm_gateway.primary_provider()
+                if admission.busy(provider, get_llm_config(provider)['models']['miaw']):
+                    return
+
+                summary = await llm_gateway.chat(
+                    'miaw',  # Cheap chat model is plenty for summaries
+                    [
+                        {"role": "system", "content": SUMMARY_PROMPT},
+                        {"role": "user", "content": format_transcript(old_turns)}
+                    ],
+                    max_tokens=300,
+                    temperature=0.3,
+                    provider=provider  # Never hedged, a slow summary isn't worth a second call
+                )
+                summary = summary.strip()
+                if not summary:
+                    return
+
+                # Only swap if the history wasn't reset or trimmed while we waited
+                if conversation_histories[context].peek(user_id) is not history:
+                    return
+                if len(history) < len(old_turns) or any(a is not b for a, b in zip(history, old_turns)):
+                    return
+
+                for _ in old_turns:
+                    history.popleft()
+                history.appendleft({"role": "system", "content": summary, "summary": True})
+        except Exception as e:
+            print(f"History compaction error ({context}/{user_id}): {type(e).__name__}: {e}")
+        finally:
+            self._running.discard((context, user_id))
+
+
+# Global compactor instance
+history_compactor = HistoryCompactor()
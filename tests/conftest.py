@@ -0,0 +1,5 @@
+import os
+
+# Keep the module-level gamification instance off the real SQLite database
+os.environ.setdefault("GAMIFICATION_BACKEND", "json")
+os.environ.setdefault("GAMIFICATION_WRITE_BEHIND", "true")
@@ -0,0 +1,48 @@
+from core.achievements import AchievementEngine
+from core.profile import Profile, achievement_catalog
+
+
+class CountingSet(set):
+    """Owned achievements that count membership checks"""
+
+    checks = 0
+
+    def __contains__(self, item):
+        CountingSet.checks += 1
+        return super().__contains__(item)
+
+
+def catalog(count):
+    return {
+        f"pat_{value}": {"rule": {"stat": "pat_count", "value": value}}
+        for value in range(1, count + 1)
+    }
+
+
+def test_evaluate_stops_at_the_highest_owned_threshold():
+    engine = AchievementEngine(catalog(1000))
+    owned = CountingSet(f"pat_{value}" for value in range(1, 901))
+    profile = {"pat_count": 903, "achievements": owned}
+
+    CountingSet.checks = 0
+    assert engine.evaluate(profile, ["pat_count"]) == ["pat_901", "pat_902", "pat_903"]
+    assert CountingSet.checks <= 4
+
+
+def test_full_evaluation_finds_thresholds_below_an_owned_one():
+    engine = AchievementEngine(catalog(5))
+    profile = {"pat_count": 5, "achievements": {"pat_5"}}
+    assert engine.evaluate(profile, ["pat_count"]) == []
+    assert engine.evaluate(profile) == ["pat_1", "pat_2", "pat_3", "pat_4"]
+
+
+def test_recent_achievements_follow_unlock_order():
+    achievement_catalog.register(["recent_a", "recent_b", "recent_c", "recent_d"])
+    profile = Profile()
+    for ach_id in ("recent_d", "recent_a", "recent_c", "recent_b"):
+        profile["achievements"].append(ach_id)
+
+    assert profile["achievements"][-3:] == ["recent_a", "recent_c", "recent_b"]
+    reloaded = Profile.from_dict(profile.to_dict())
+    assert reloaded["achievements"][-3:] == ["recent_a", "recent_c", "recent_b"]
+    assert len(reloaded["achievements"]) == 4
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from core.admission import AdmissionController, AdmissionRejected, parse_duration
+
+SETTINGS = {"requests_per_minute": 60, "tokens_per_minute": 100000}
+
+
+def test_caller_is_rejected_once_the_wait_would_pass_its_deadline():
+    admission = AdmissionController(max_queue=10, max_wait=0.05)
+
+    async def calls():
+        # One request per second: the burst of 60 is spent, the next slot is ~1s away
+        for _ in range(60):
+            await admission.acquire("openai", "gpt", SETTINGS, 10)
+        await admission.acquire("openai", "gpt", SETTINGS, 10)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        asyncio.run(calls())
+    assert 0 < rejected.value.retry_after <= 1.0
+    assert admission.rejected == 1
+
+
+def test_waiters_queue_in_order_and_overflow_is_rejected():
+    admission = AdmissionController(max_queue=2, max_wait=5.0)
+    settings = {"requests_per_minute": 600, "tokens_per_minute": 100000}  # A slot every 0.1s
+    admitted = []
+
+    async def call(name):
+        await admission.acquire("openai", "gpt", settings, 10)
+        admitted.append(name)
+
+    async def calls():
+        for _ in range(600):
+            await admission.acquire("openai", "gpt", settings, 10)
+        waiters = [asyncio.ensure_future(call(name)) for name in ("a", "b")]
+        await asyncio.sleep(0.01)
+        assert admission.busy("openai", "gpt")
+        with pytest.raises(AdmissionRejected):
+            await call("c")  # Queue is full
+        await asyncio.gather(*waiters)
+
+    asyncio.run(calls())
+    assert admitted == ["a", "b"] and admission.rejected == 1
+
+
+def test_refund_returns_unused_tokens():
+    admission = AdmissionController(max_queue=10, max_wait=0.05)
+    settings = {"requests_per_minute": 100, "tokens_per_minute": 1000}
+
+    async def calls():
+        await admission.acquire("openai", "gpt", settings, 1000)
+        admission.refund("openai", "gpt", 1000, 100)
+        await admission.acquire("openai", "gpt", settings, 800)  # Fits only thanks to the refund
+
+    asyncio.run(calls())
+
+
+def test_parse_duration_formats():
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration(None) is None
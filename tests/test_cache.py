@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from core.cache import ResponseCache, is_follow_up, normalize_question
+from core.semantic import SEMANTIC_CACHE_ENABLED, SemanticIndex
+
+
+def test_normalize_question_drops_filler_and_punctuation():
+    assert normalize_question("Apa itu fotosintesis??") == normalize_question("jelaskan, fotosintesis!")
+
+
+def test_normalize_question_keeps_operators_and_symbols():
+    keys = {normalize_question(q) for q in ("berapa 2+2", "berapa 2-2", "berapa 2*2", "berapa 2 2")}
+    assert len(keys) == 4
+    keys = {normalize_question(q) for q in ("apa itu C++", "apa itu C#", "apa itu C")}
+    assert len(keys) == 3
+
+
+@pytest.mark.skipif(not SEMANTIC_CACHE_ENABLED, reason="numpy not installed")
+def test_semantic_index_needs_matching_numbers_and_symbols():
+    index = SemanticIndex(capacity=8)
+    index.add(normalize_question("sejarah perang dunia 1"), "ww1", "sensei", 60)
+    index.add(normalize_question("berapa 2+2"), "sum", "sensei", 60)
+
+    assert index.lookup(normalize_question("sejarah perang dunia 1?"), "sensei") == "ww1"
+    assert index.lookup(normalize_question("sejarah perang dunia 2"), "sensei") is None
+    assert index.lookup(normalize_question("berapa 2-2"), "sensei") is None
+
+
+def test_follow_ups_are_told_apart_from_standalone_questions():
+    for question in ("kenapa?", "contohnya dong", "jelaskan lagi", "yang tadi maksudnya gimana", "why?"):
+        assert is_follow_up(question), question
+    for question in ("apa itu fotosintesis?", "kenapa langit biru", "berapa 2+2", "explain photosynthesis"):
+        assert not is_follow_up(question), question
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "jawaban"
+
+    async def ask():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(5)))
+
+    assert asyncio.run(ask()) == ["jawaban"] * 5
+    assert len(calls) == 1 and cache.coalesced == 4
+    assert cache.get("key") == "jawaban"
+
+
+def test_waiters_see_the_leaders_exception_and_nothing_is_cached():
+    cache = ResponseCache()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("provider down")
+
+    async def ask():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(ask())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("key") is None and not cache._inflight
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import core.gamification as gamification_module
+from core.achievements import AchievementEngine
+from core.gamification import GamificationSystem
+
+
+@pytest.fixture
+def system(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gamification_module, "GAMIFICATION_BACKEND", "sqlite")
+    system = GamificationSystem()
+    yield system
+    system.close()
+
+
+def seed(system, coins):
+    for user_id, amount in coins.items():
+        system.get_user_profile(user_id)["coins"] = amount
+        system.record_event("test", user_id, "coins")
+    assert asyncio.run(system.flush())
+
+
+def test_leaderboard_served_from_storage_while_warming(system):
+    seed(system, {"a": 5, "b": 50, "c": 20, "d": 20})
+
+    async def query():
+        page = system.leaderboard_page("coins", 1, 3)
+        rank = system.leaderboard_rank("d", "coins")
+        achievements = system.leaderboard_page("achievements")
+        return page, rank, achievements
+
+    page, rank, achievements = asyncio.run(query())
+    assert [(e["user_id"], e["score"]) for e in page["entries"]] == [("b", 50), ("c", 20), ("d", 20)]
+    assert page["total"] == 4 and page["pages"] == 2
+    assert rank == {"rank": 3, "total": 4, "score": 20}
+    assert achievements["warming"]  # Not an indexed column
+
+
+def test_leaderboard_built_in_background_includes_unsaved_changes(system):
+    seed(system, {"a": 5, "b": 50})
+
+    async def build():
+        system.start_leaderboards()
+        system.get_user_profile("c")["coins"] = 99  # Changed but not flushed yet
+        await system._leaderboard_task
+        return system.leaderboard_page("coins")
+
+    page = asyncio.run(build())
+    assert [(e["user_id"], e["score"]) for e in page["entries"]] == [("c", 99), ("b", 50), ("a", 5)]
+    assert system.leaderboard_rank("a", "coins")["rank"] == 3
+
+
+def test_guild_leaderboard_warms_up_then_uses_global_scores(system):
+    seed(system, {"a": 5, "b": 50, "c": 20})
+
+    async def query():
+        warming = system.leaderboard_page("coins", guild_id="g", member_ids=["a", "c"])
+        system.start_leaderboards()
+        await system._leaderboard_task
+        page = system.leaderboard_page("coins", guild_id="g", member_ids=["a", "c"])
+        system.guild_member_joined("g", "b")
+        return warming, page, system.leaderboard_rank("b", "coins", guild_id="g")
+
+    warming, page, rank = asyncio.run(query())
+    assert warming["warming"]
+    assert [(e["user_id"], e["score"]) for e in page["entries"]] == [("c", 20), ("a", 5)]
+    assert rank == {"rank": 1, "total": 3, "score": 50}
+
+
+def test_apply_events_journals_each_kind_of_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gamification_module, "GAMIFICATION_BACKEND", "journal")
+    system = GamificationSystem()
+    try:
+        result = system.apply_events("u1", [{"interaction": "miaw"}, {"exp": 5, "source": "miaw_chat"}])
+        assert "first_chat" in [achievement["id"] for achievement in result["achievements"]]
+        assert asyncio.run(system.flush())
+    finally:
+        system.close()
+
+    with open(system.store.journal_path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f][1:]  # After profile_created
+    assert [entry["e"] for entry in entries] == ["interaction_tracked", "exp_added", "achievement_unlocked"]
+    assert entries[0]["f"]["miaw_interactions"] == 1
+    assert "first_chat" in entries[2]["f"]["achievements"]
+
+
+def test_achievement_reward_exp_levels_up_in_the_same_turn(system):
+    profile = system.get_user_profile("u1")
+    profile["exp"] = system.get_exp_for_level(2) - 2
+
+    result = system.apply_events("u1", [{"interaction": "miaw"}, {"exp": 1, "source": "miaw_chat"}])
+    assert [achievement["id"] for achievement in result["achievements"]] == ["first_chat"]
+    assert result["exp"]["level_ups"] == 1 and result["exp"]["new_level"] == 2
+    assert profile["level"] == 2
+    assert profile["exp"] < system.get_exp_for_level(3)
+
+
+def test_exp_grants_unlock_achievements_reading_exp_fields(system):
+    system.achievements["big_spender"] = {
+        "name": "Big Spender", "description": "", "exp": 0, "icon": "💰",
+        "rule": {"stat": "coins", "op": ">=", "value": 100}
+    }
+    system.achievement_engine = AchievementEngine(system.achievements)
+
+    result = system.add_exp("solo", 300, "daily_reward")
+    assert [achievement["id"] for achievement in result["achievements"]] == ["big_spender"]
+
+    results = system.add_exp_bulk({"a": 300, "b": 10})
+    assert [achievement["id"] for achievement in results["a"]["achievements"]] == ["big_spender"]
+    assert results["b"]["achievements"] == []
+    assert "big_spender" in system.get_user_profile("a")["achievements"]
+
+
+def test_leaderboard_build_reads_the_store_off_the_event_loop(system, monkeypatch):
+    seed(system, {"a": 5})
+    threads = []
+    iter_profiles = system.store.iter_profiles
+
+    def tracking_iter_profiles():
+        threads.append(threading.current_thread())
+        return iter_profiles()
+
+    monkeypatch.setattr(system.store, "iter_profiles", tracking_iter_profiles)
+
+    async def build():
+        system.start_leaderboards()
+        await system._leaderboard_task
+
+    asyncio.run(build())
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,30 @@
+from core.keywords import analyze_message
+
+
+def categories(text):
+    return analyze_message(text).categories
+
+
+def test_keywords_match_whole_words_only():
+    assert 'greeting' in categories("hai miawka")
+    assert 'greeting' not in categories("chai latte enak")
+    assert 'game' in categories("ayo main bareng")
+    assert 'game' not in categories("beli domain baru")
+    assert 'pat' not in categories("update patch terbaru")
+    assert 'educational' not in categories("somehow it works")
+
+
+def test_keywords_match_indonesian_suffixes_and_phrases():
+    assert 'love' in categories("sayangku")
+    assert 'food' in categories("makannya udah?")
+    assert 'game' in categories("gamemu apa")
+    assert 'confused' in categories("aku ga   ngerti")
+    assert 'farewell' in categories("See You besok")
+    assert 'farewell' not in categories("see yours")
+
+
+def test_question_mark_adds_sensei_bonus():
+    features = analyze_message("Why is the sky blue?")
+    assert {'educational', 'question'} <= features.categories
+    assert features.sensei_bonus == 5
+    assert analyze_message("langit biru").sensei_bonus == 0
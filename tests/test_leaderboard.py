@@ -0,0 +1,68 @@
+import random
+
+from core.leaderboard import GuildLeaderboards, Leaderboard, LeaderboardIndex, SkipList
+
+
+def test_skiplist_matches_sorted_list():
+    rng = random.Random(7)
+    skiplist = SkipList()
+    reference = []
+    for _ in range(3000):
+        key = rng.randint(0, 500)
+        if key in reference and rng.random() < 0.5:
+            assert skiplist.remove(key)
+            reference.remove(key)
+        elif key not in reference:
+            skiplist.insert(key)
+            reference.append(key)
+            reference.sort()
+
+    assert list(skiplist) == reference
+    assert len(skiplist) == len(reference)
+    for index, key in enumerate(reference):
+        assert skiplist.rank(key) == index
+    for offset in (0, 1, len(reference) // 2, len(reference) - 1, len(reference)):
+        assert list(skiplist.iter_from(offset)) == reference[offset:]
+    assert skiplist.rank(-1) is None
+    assert not skiplist.remove(-1)
+
+
+def test_leaderboard_orders_by_score_then_user():
+    board = Leaderboard("coins")
+    board.update("a", 10)
+    board.update("b", 30)
+    board.update("c", 20)
+    board.update("a", 40)  # Re-rank on change
+    board.update("d", 20)
+
+    assert board.page(0, 10) == [("a", 40), ("b", 30), ("c", 20), ("d", 20)]
+    assert board.page(1, 2) == [("b", 30), ("c", 20)]
+    assert board.rank("a") == 0
+    assert board.rank("d") == 3
+    assert board.rank("missing") is None
+    assert len(board) == 4
+
+
+def test_guild_view_follows_membership():
+    global_index = LeaderboardIndex()
+    global_index.update("a", {"coins": 10})
+    global_index.update("b", {"coins": 30})
+    global_index.update("c", {"coins": 20})
+    guilds = GuildLeaderboards()
+
+    view = guilds.view("g", iter(["a", "b", "nobody"]), global_index)
+    assert view.page("coins", 0, 10) == [("b", 30), ("a", 10)]
+
+    # Join and leave in the same window used to leave a same-size view stale
+    guilds.add_member("g", "c", global_index)
+    guilds.remove_member("g", "b")
+    assert guilds.view("g", [], global_index).page("coins", 0, 10) == [("c", 20), ("a", 10)]
+
+    # Members without a profile show up once they get one
+    guilds.update("nobody", {"coins": 50})
+    assert view.rank("coins", "nobody") == 0
+    guilds.update("b", {"coins": 99})  # No longer a member
+    assert view.rank("coins", "b") is None
+
+    guilds.drop("g")
+    assert not guilds.member_guilds
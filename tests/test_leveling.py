@@ -0,0 +1,46 @@
+import random
+
+from core.gamification import cumulative_exp, gamification, level_for_exp, LEVEL_TABLE_SIZE
+
+
+def grant_exp_loop(profile, exp):
+    """The original level-up loop, as a reference"""
+    old_level = profile["level"]
+    profile["exp"] += exp
+    profile["total_exp"] += exp
+    profile["coins"] += exp // 2
+    level_ups = 0
+    while profile["exp"] >= gamification.get_exp_for_level(profile["level"] + 1):
+        profile["exp"] -= gamification.get_exp_for_level(profile["level"] + 1)
+        profile["level"] += 1
+        level_ups += 1
+        profile["coins"] += profile["level"] * 10
+    return old_level, level_ups
+
+
+def new_profile(level=1, exp=0):
+    return {"level": level, "exp": exp, "total_exp": 0, "coins": 0}
+
+
+def test_closed_form_matches_loop():
+    rng = random.Random(42)
+    for _ in range(2000):
+        level = rng.randint(1, 60)
+        exp = rng.randint(0, gamification.get_exp_for_level(level + 1) - 1)
+        grant = rng.choice([0, 1, 10, 124, 125, 126, rng.randint(0, 500_000)])
+
+        expected = new_profile(level, exp)
+        old_level, level_ups = grant_exp_loop(expected, grant)
+        actual = new_profile(level, exp)
+        result = gamification._grant_exp(actual, grant)
+
+        assert actual == expected
+        assert result["old_level"] == old_level
+        assert result["level_ups"] == level_ups
+
+
+def test_level_for_exp_boundaries():
+    assert level_for_exp(0) == 1
+    for level in (2, 10, LEVEL_TABLE_SIZE - 1, LEVEL_TABLE_SIZE, LEVEL_TABLE_SIZE + 5, 5000):
+        assert level_for_exp(cumulative_exp(level)) == level
+        assert level_for_exp(cumulative_exp(level) - 1) == level - 1
@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.circuit import CircuitBreaker
+from core.globals import get_llm_config
+from core.llm import HedgeBudget, LLMGateway
+
+
+def test_hedged_stream_closes_loser_before_relaying_winner(monkeypatch):
+    gateway = LLMGateway()
+    events = []
+
+    async def fake_stream(provider, context, messages, **kwargs):
+        try:
+            await asyncio.sleep(0.05 if provider == "fast" else 0.2)
+            for i in range(3):
+                yield f"{provider}{i}"
+                await asyncio.sleep(0.01)
+        finally:
+            events.append(f"closed {provider}")
+
+    monkeypatch.setattr(gateway, "_pick_providers", lambda: ("slow", "fast"))
+    monkeypatch.setattr(gateway, "_hedge_delay", lambda provider, context, kind: 0.01)
+    monkeypatch.setattr(gateway, "_stream_once", fake_stream)
+
+    async def consume():
+        async for delta in gateway.stream_chat("sensei", []):
+            events.append(delta)
+
+    asyncio.run(consume())
+    assert events == ["closed slow", "fast0", "fast1", "fast2", "closed fast"]
+
+
+def test_timeouts_pull_the_adaptive_timeout_back_up(monkeypatch):
+    gateway = LLMGateway()
+    settings = {"timeout": 20.0, "min_timeout": 8.0}
+    outcome = {}
+
+    async def fake_create(config, context, messages, reserved, **kwargs):
+        if outcome.get("timeout"):
+            raise asyncio.TimeoutError()
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    monkeypatch.setattr(gateway, "_create", fake_create)
+    monkeypatch.setattr(gateway, "get_breaker", lambda provider, model: CircuitBreaker("test"))
+
+    async def calls(count):
+        for _ in range(count):
+            try:
+                await gateway._chat_once("openai", "miaw", [], None, None, None)
+            except asyncio.TimeoutError:
+                pass
+
+    asyncio.run(calls(20))
+    assert gateway._adaptive_timeout("openai", "miaw", "chat", settings) == 8.0
+
+    outcome["timeout"] = True
+    asyncio.run(calls(5))
+    assert gateway._adaptive_timeout("openai", "miaw", "chat", settings) == 20.0
+
+
+def test_hedge_budget_allows_a_share_of_recent_calls():
+    budget = HedgeBudget(ratio=0.05, minimum=2, window=60.0)
+    for _ in range(100):
+        budget.record_call()
+    spent = sum(budget.try_spend() for _ in range(10))
+    assert spent == 5 and budget.denied == 5
+
+
+def test_hedge_delay_is_capped_per_context():
+    gateway = LLMGateway()
+    miaw = gateway._hedge_delay("openai", "miaw", "chat")
+    sensei = gateway._hedge_delay("openai", "sensei", "chat")
+    assert miaw < sensei < get_llm_config("openai")["settings"]["sensei"]["timeout"]
+
+
+def test_slow_primary_is_not_hedged_once_the_budget_is_spent(monkeypatch):
+    gateway = LLMGateway()
+    gateway.hedge_budget = HedgeBudget(ratio=0.0, minimum=0)
+    called = []
+
+    async def fake_chat(provider, context, messages, **kwargs):
+        called.append(provider)
+        await asyncio.sleep(0.05)
+        return provider
+
+    monkeypatch.setattr(gateway, "_pick_providers", lambda: ("slow", "fast"))
+    monkeypatch.setattr(gateway, "_hedge_delay", lambda provider, context, kind: 0.01)
+    monkeypatch.setattr(gateway, "_chat_once", fake_chat)
+
+    assert asyncio.run(gateway.chat("sensei", [])) == "slow"
+    assert called == ["slow"] and gateway.hedge_budget.denied == 1
+
+
+def test_served_reports_the_provider_that_answered(monkeypatch):
+    gateway = LLMGateway()
+
+    async def fake_chat(provider, context, messages, **kwargs):
+        await asyncio.sleep(0.2 if provider == "slow" else 0.01)
+        return provider
+
+    monkeypatch.setattr(gateway, "_pick_providers", lambda: ("slow", "fast"))
+    monkeypatch.setattr(gateway, "_hedge_delay", lambda provider, context, kind: 0.01)
+    monkeypatch.setattr(gateway, "_chat_once", fake_chat)
+
+    served = {}
+    assert asyncio.run(gateway.chat("sensei", [], served=served)) == "fast"
+    assert served["provider"] == "fast"
@@ -0,0 +1,37 @@
+from core.ratelimit import RateLimiter
+
+
+def test_gcra_allows_burst_then_spaces_hits():
+    limiter = RateLimiter("test_burst", rate=3, per=60)
+    assert [limiter.hit("u", now=0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.hit("u", now=0) == 20.0  # One hit frees up every per / rate seconds
+    assert limiter.hit("u", now=19) == 1.0
+    assert limiter.hit("u", now=20) == 0.0
+    assert limiter.hit("other", now=20) == 0.0
+
+
+def test_gcra_retry_after_does_not_spend():
+    limiter = RateLimiter("test_peek", rate=1, per=10)
+    assert limiter.retry_after("u", now=0) == 0.0
+    assert limiter.hit("u", now=0) == 0.0
+    assert limiter.retry_after("u", now=4) == 6.0
+    assert limiter.retry_after("u", now=4) == 6.0
+    assert limiter.hit("u", now=10) == 0.0
+
+
+def test_gcra_block_and_reset():
+    limiter = RateLimiter("test_block", rate=1, per=86400)
+    limiter.block("u", 100, now=0)
+    assert limiter.retry_after("u", now=50) == 50.0
+    assert limiter.retry_after("u", now=100) == 0.0
+    limiter.reset("u")
+    assert limiter.hit("u", now=1) == 0.0
+
+
+def test_gcra_evicts_only_recovered_keys():
+    limiter = RateLimiter("test_evict", rate=2, per=10)
+    limiter.hit("idle", now=0)
+    limiter.hit("busy", now=8)
+    assert limiter.evict_idle(now=6) == 1
+    assert "busy" in limiter.tat and "idle" not in limiter.tat
+    assert len(limiter) == 1
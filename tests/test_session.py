@@ -0,0 +1,45 @@
+from core.history import message_tokens
+from core.session import History, SessionBudget, SessionStore, value_tokens
+
+
+def turn(role, words):
+    return {"role": role, "content": " ".join(["kata"] * words)}
+
+
+def test_summary_survives_history_wrap_around():
+    history = History(maxlen=4)
+    history.append({"role": "system", "content": "ringkasan lama", "summary": True})
+    for i in range(10):
+        history.append({"role": "user", "content": f"pesan {i}"})
+
+    assert history[0]["summary"]
+    assert [message["content"] for message in list(history)[1:]] == ["pesan 7", "pesan 8", "pesan 9"]
+    assert history.tokens == sum(message_tokens(message) for message in history)
+
+
+def test_budget_evicts_least_recent_user_across_stores():
+    budget = SessionBudget(max_tokens=300)
+    histories = SessionStore("histories", 100, 60, lambda: History(maxlen=10), budget)
+    moods = SessionStore("moods", 100, 60, budget=budget)
+
+    histories.get_or_create("old").append(turn("user", 100))
+    moods["old"] = "ceria"
+    histories.get_or_create("new").append(turn("user", 100))
+    assert "old" in histories and budget.evictions == 0
+
+    histories["new"].append(turn("assistant", 100))  # Growing in place pushes the total over
+    assert "old" not in histories and "new" in histories
+    assert budget.used == histories.peek("new").tokens + value_tokens(moods.peek("old")) <= budget.max_tokens
+
+
+def test_budget_is_released_when_sessions_leave():
+    budget = SessionBudget(max_tokens=10_000)
+    store = SessionStore("histories", 1, 60, lambda: History(maxlen=10), budget)
+    first = store.get_or_create("a")
+    first.append(turn("user", 20))
+    store.get_or_create("b").append(turn("user", 30))  # Evicts "a" for the user cap
+
+    first.append(turn("assistant", 50))  # Detached, no longer counted
+    assert budget.used == store.peek("b").tokens
+    store.pop("b")
+    assert budget.used == 0
@@ -0,0 +1,109 @@
+import pytest
+
+from core.storage import JournalProfileStore, ProfileStore, SqliteProfileStore
+
+
+def open_journal(tmp_path, compact_every=10000):
+    return JournalProfileStore(
+        str(tmp_path / "snapshot.json"), str(tmp_path / "gamification.journal"), compact_every
+    )
+
+
+def test_journal_replays_recorded_fields(tmp_path):
+    store = open_journal(tmp_path)
+    store.record("exp_gained", "u1", {"exp": 10, "coins": 1})
+    store.record("exp_gained", "u1", {"exp": 25})
+    store.write_pending()
+    store.close()
+
+    store = open_journal(tmp_path)
+    assert store.load("u1") == {"exp": 25, "coins": 1}
+    assert store.lines == 2
+    store.close()
+
+
+def test_journal_truncates_torn_tail_before_appending(tmp_path):
+    store = open_journal(tmp_path)
+    store.record("exp_gained", "u1", {"coins": 1})
+    store.write_pending()
+    store.close()
+    # Crash in the middle of writing the next line
+    with open(tmp_path / "gamification.journal", "a", encoding="utf-8") as f:
+        f.write('{"t":1,"e":"exp_gained","u":"u1","f":{"co')
+
+    store = open_journal(tmp_path)
+    assert store.load("u1") == {"coins": 1}
+    store.record("exp_gained", "u1", {"coins": 5})
+    store.record("exp_gained", "u2", {"coins": 7})
+    store.write_pending()
+    store.close()
+
+    store = open_journal(tmp_path)
+    assert store.load("u1") == {"coins": 5}
+    assert store.load("u2") == {"coins": 7}
+    assert store.lines == 3
+    store.close()
+
+
+def test_journal_compaction_keeps_profiles(tmp_path):
+    store = open_journal(tmp_path, compact_every=2)
+    store.record("exp_gained", "u1", {"coins": 3})
+    store.save_many({"u2": {"coins": 4}})
+    assert store.lines == 0  # Folded into the snapshot
+    store.close()
+
+    store = open_journal(tmp_path)
+    assert store.load("u1") == {"coins": 3}
+    assert store.load("u2") == {"coins": 4}
+    store.close()
+
+
+def test_sqlite_round_trip(tmp_path):
+    store = SqliteProfileStore(str(tmp_path / "gamification.db"))
+    store.save_many({"u1": {"level": 3, "coins": 9}, "u2": {"level": 1}})
+    store.close()
+
+    store = SqliteProfileStore(str(tmp_path / "gamification.db"))
+    assert store.load("u1") == {"level": 3, "coins": 9}
+    assert store.load("missing") is None
+    assert dict(store.iter_profiles()) == {"u1": {"level": 3, "coins": 9}, "u2": {"level": 1}}
+    assert store.count() == 2
+    store.close()
+
+
+def test_sqlite_reads_dont_wait_for_open_write(tmp_path):
+    store = SqliteProfileStore(str(tmp_path / "gamification.db"))
+    store.save_many({"u1": {"coins": 1}})
+
+    writer = store._write_conn
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("UPDATE profiles SET data = ? WHERE user_id = 'u1'", ('{"coins":2}',))
+    assert store.load("u1") == {"coins": 1}  # Last committed version, no lock wait
+    writer.commit()
+    assert store.load("u1") == {"coins": 2}
+    store.close()
+
+
+def test_incomplete_backend_fails_at_construction():
+    class LoadOnlyStore(ProfileStore):
+        def load(self, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        LoadOnlyStore()
+
+
+def test_journal_reads_are_snapshots_of_the_writer_state(tmp_path):
+    store = open_journal(tmp_path)
+    store.record("exp_gained", "u1", {"exp": 10})
+    store.write_pending()
+
+    profiles = store.iter_profiles()
+    loaded = store.load("u1")
+    store.record("exp_gained", "u1", {"exp": 99})
+    store.write_pending()  # Writer thread applies a newer entry
+
+    assert dict(profiles) == {"u1": {"exp": 10}}
+    assert loaded == {"exp": 10}
+    assert store.load("u1") == {"exp": 99}
+    store.close()
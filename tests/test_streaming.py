@@ -0,0 +1,33 @@
+import asyncio
+
+from core.streaming import StreamingReply
+
+
+class FakeContext:
+    def __init__(self):
+        self.sent = []
+
+    async def reply(self, content=None, **kwargs):
+        self.sent.append(content)
+        return self
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+        return self
+
+    async def edit(self, content=None, **kwargs):
+        self.sent[-1] = content
+
+
+def test_stream_without_visible_text_finishes_empty_or_with_fallback():
+    async def stream():
+        ctx = FakeContext()
+        reply = StreamingReply(ctx)
+        for delta in ("<think>hmm", " masih mikir"):
+            await reply.feed(delta)
+        answer = await reply.finish()
+        assert answer == "" and ctx.sent == []
+        assert await reply.finish(fallback="coba lagi") == "coba lagi"
+        return ctx.sent
+
+    assert asyncio.run(stream()) == ["coba lagi"]
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+import core.summarizer as summarizer
+from core.admission import admission
+from core.globals import get_llm_config, new_history
+from core.llm import llm_gateway
+from core.session import SessionStore
+
+
+@pytest.fixture(autouse=True)
+def histories(monkeypatch):
+    """Private session stores, so the global chat state is never touched"""
+    histories = {'miaw': SessionStore('miaw', 100, 60, new_history)}
+    monkeypatch.setattr(summarizer, "conversation_histories", histories)
+    return histories
+
+
+def fill(user_id, turns, words):
+    history = summarizer.conversation_histories['miaw'][user_id] = new_history()
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": " ".join(["kata"] * words)})
+    return history
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_chat(context, messages, **kwargs):
+        calls.append(kwargs)
+        return "ringkasan"
+
+    monkeypatch.setattr(llm_gateway, "chat", fake_chat)
+    monkeypatch.setattr(llm_gateway, "primary_provider", lambda: "openai")
+    return calls
+
+
+def run_schedule(user_id):
+    async def go():
+        compactor = summarizer.HistoryCompactor()
+        compactor.maybe_schedule('miaw', user_id)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(go())
+
+
+def test_short_turns_are_not_compacted(calls):
+    history = fill("short", 6, 5)
+    run_schedule("short")
+    assert calls == []
+    assert len(history) == 6
+
+
+def test_short_turns_compact_before_the_ring_buffer_wraps(calls):
+    history = fill("chatty", 0, 0)
+
+    async def chat():
+        compactor = summarizer.HistoryCompactor()
+        for turn in range(15):
+            history.append({"role": "user", "content": f"pesan {turn}"})
+            history.append({"role": "assistant", "content": f"balasan {turn}"})
+            assert len(history) < history.maxlen  # Nothing was ever evicted unsummarized
+            compactor.maybe_schedule('miaw', "chatty")
+            await asyncio.sleep(0.01)
+
+    asyncio.run(chat())
+    assert calls
+    assert history[0]["summary"]
+    assert history[-1]["content"] == "balasan 14"
+
+
+def test_turns_over_the_token_budget_compact_unhedged(calls):
+    history = fill("long", 6, 250)
+    run_schedule("long")
+    assert calls and calls[0]["provider"] == "openai"
+    assert history[0]["summary"] and len(history) == 5
+
+
+def test_compaction_waits_while_replies_are_queued(calls, monkeypatch):
+    fill("busy", 8, 200)
+    model = get_llm_config("openai")["models"]["miaw"]
+    monkeypatch.setattr(admission, "busy", lambda provider, name: (provider, name) == ("openai", model))
+    run_schedule("busy")
+    assert calls == []